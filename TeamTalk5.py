@@ -1242,24 +1242,86 @@ class TeamTalkError(Exception):
     pass
 
 # Construct multiple TextMessage objects for text messages longer than TT_STRLEN
+def _rfindUnit(data: bytes, sep: bytes, lo: int, hi: int, origin: int, unit: int) -> int:
+    # bytes.rfind() that only accepts matches aligned to a TTCHAR unit
+    while hi > lo:
+        i = data.rfind(sep, lo, hi)
+        if i < 0 or (i - origin) % unit == 0:
+            return i
+        hi = i + len(sep) - 1
+    return -1
+
+def splitTextMessage(content: str, nMaxLen: int = TT_STRLEN - 1, bKeepSeparators: bool = True):
+    """Yields pieces of content that each fit in a TextMessage, already converted for szMessage.
+
+    nMaxLen counts TTCHARs: UTF-8 bytes, or UTF-16 code units on Windows. Splits prefer a line
+    break, then a space, in the second half of a piece, and never cut a character in two. With
+    bKeepSeparators=False the line break or space at a split is dropped, for pieces that are sent
+    as separate messages. Raises ValueError if nMaxLen < 4.
+    """
+    if nMaxLen < 4:
+        # A piece must hold at least one whole character (up to 4 UTF-8 bytes), or no split makes progress
+        raise ValueError("nMaxLen must be at least 4")
+    if isinstance(content, bytes):
+        content = content.decode('utf-8', errors='replace')
+    wide = sys.platform == "win32"
+    data, unit = (content.encode('utf-16-le'), 2) if wide else (content.encode('utf-8'), 1)
+    newline, space = ("\n".encode('utf-16-le'), " ".encode('utf-16-le')) if wide else (b"\n", b" ")
+    limit, total, pos = nMaxLen * unit, len(data), 0
+    while pos < total:
+        end = pos + limit
+        if end >= total:
+            cut = next_pos = total
+        else:
+            lo = pos + (limit // 2 // unit) * unit
+            sep = _rfindUnit(data, newline, lo, end, pos, unit)
+            if sep < 0: sep = _rfindUnit(data, space, lo, end, pos, unit)
+            if sep >= 0:
+                next_pos = sep + unit
+                cut = next_pos if bKeepSeparators else sep
+            else:
+                cut = end
+                if wide:
+                    # Don't separate a surrogate pair
+                    if 0xDC00 <= int.from_bytes(data[cut:cut + 2], 'little') <= 0xDFFF: cut -= 2
+                else:
+                    # Back up to the start of a UTF-8 sequence
+                    while cut > pos and (data[cut] & 0xC0) == 0x80: cut -= 1
+                next_pos = cut
+        piece = data[pos:cut]
+        pos = next_pos
+        if piece:
+            yield piece.decode('utf-16-le') if wide else piece
+
+def iterTextMessages(content: str, nMsgType: TextMsgType,
+                     nToUserID: int = 0, nChannelID: int = 0, nFromUserID: int = 0,
+                     szFromUsername: str = "", bChain: bool = True):
+    """Lazily yields the TextMessages for content.
+
+    With bChain=True the pieces are flagged bMore so clients join them back into one message;
+    otherwise each piece is a message of its own.
+    """
+    fromUsername = ttstr(szFromUsername)
+    pending = None
+    for piece in splitTextMessage(content, bKeepSeparators=bChain):
+        if pending is not None:
+            pending.bMore = bChain
+            yield pending
+        pending = TextMessage()
+        pending.nMsgType = nMsgType
+        pending.nFromUserID = nFromUserID
+        pending.szFromUsername = fromUsername
+        pending.nToUserID = nToUserID
+        pending.nChannelID = nChannelID
+        pending.szMessage = piece
+    if pending is not None:
+        pending.bMore = False
+        yield pending
+
 def buildTextMessage(content: str, nMsgType: TextMsgType,
                      nToUserID: int = 0, nChannelID: int = 0, nFromUserID: int = 0,
                      szFromUsername: str = "") -> [TextMessage]:
-    result = []
-    converted_content = ttstr(content)
-    while len(converted_content) > 0:
-        textmsg = TextMessage()
-        textmsg.nMsgType = nMsgType
-        textmsg.nFromUserID = nFromUserID
-        textmsg.szFromUsername = ttstr(szFromUsername)
-        textmsg.nToUserID = nToUserID
-        textmsg.nChannelID = nChannelID
-        textmsg.szMessage = converted_content[0:TT_STRLEN-1]
-        converted_content = converted_content[TT_STRLEN-1:]
-        textmsg.bMore = len(converted_content) > 0
-        result.append(textmsg)
-
-    return result
+    return list(iterTextMessages(content, nMsgType, nToUserID, nChannelID, nFromUserID, szFromUsername))
 
 
 class TeamTalk(object):
@@ -1268,6 +1330,9 @@ class TeamTalk(object):
         self._tt = _InitTeamTalkPoll()
         if not self._tt:
             raise TeamTalkError("failed to initialize")
+        self._msg = TTMessage()
+        self._waitMSec = INT32()
+        self._dispatch = self._buildDispatchTable()
 
     def closeTeamTalk(self):
         return _CloseTeamTalk(self._tt)
@@ -1275,87 +1340,78 @@ class TeamTalk(object):
     def __del__(self):
         self.closeTeamTalk()
 
-    def runEventLoop(self, nWaitMSec = -1):
-        msg = self.getMessage(nWaitMS = nWaitMSec)
-        event = msg.nClientEvent
-        if event == ClientEvent.CLIENTEVENT_CON_SUCCESS:
-            self.onConnectSuccess()
-        if event == ClientEvent.CLIENTEVENT_CON_CRYPT_ERROR:
-            self.onConnectCryptError(msg.clienterrormsg)
-        if event == ClientEvent.CLIENTEVENT_CON_FAILED:
-            self.onConnectFailed()
-        if event == ClientEvent.CLIENTEVENT_CON_LOST:
-            self.onConnectionLost()
-        if event == ClientEvent.CLIENTEVENT_CMD_PROCESSING:
-            self.onCmdProcessing(msg.nSource, not msg.bActive)
-        if event == ClientEvent.CLIENTEVENT_CMD_ERROR:
-            self.onCmdError(msg.nSource, msg.clienterrormsg)
-        if event == ClientEvent.CLIENTEVENT_CMD_SUCCESS:
-            self.onCmdSuccess(msg.nSource)
-        if event == ClientEvent.CLIENTEVENT_CMD_MYSELF_LOGGEDIN:
-            self.onCmdMyselfLoggedIn(msg.nSource, msg.useraccount)
-        if event == ClientEvent.CLIENTEVENT_CMD_MYSELF_LOGGEDOUT:
-            self.onCmdMyselfLoggedOut()
-        if event == ClientEvent.CLIENTEVENT_CMD_MYSELF_KICKED:
-            self.onCmdMyselfKickedFromChannel(msg.nSource, msg.user)
-        if event == ClientEvent.CLIENTEVENT_CMD_USER_LOGGEDIN:
-            self.onCmdUserLoggedIn(msg.user)
-        if event == ClientEvent.CLIENTEVENT_CMD_USER_LOGGEDOUT:
-            self.onCmdUserLoggedOut(msg.user)
-        if event == ClientEvent.CLIENTEVENT_CMD_USER_UPDATE:
-            self.onCmdUserUpdate(msg.user)
-        if event == ClientEvent.CLIENTEVENT_CMD_USER_JOINED:
-            self.onCmdUserJoinedChannel(msg.user)
-        if event == ClientEvent.CLIENTEVENT_CMD_USER_LEFT:
-            self.onCmdUserLeftChannel(msg.nSource, msg.user)
-        if event == ClientEvent.CLIENTEVENT_CMD_USER_TEXTMSG:
-            self.onCmdUserTextMessage(msg.textmessage)
-        if event == ClientEvent.CLIENTEVENT_CMD_CHANNEL_NEW:
-            self.onCmdChannelNew(msg.channel)
-        if event == ClientEvent.CLIENTEVENT_CMD_CHANNEL_UPDATE:
-            self.onCmdChannelUpdate(msg.channel)
-        if event == ClientEvent.CLIENTEVENT_CMD_CHANNEL_REMOVE:
-            self.onCmdChannelRemove(msg.channel)
-        if event == ClientEvent.CLIENTEVENT_CMD_SERVER_UPDATE:
-            self.onCmdServerUpdate(msg.serverproperties)
-        if event == ClientEvent.CLIENTEVENT_CMD_FILE_NEW:
-            self.onCmdFileNew(msg.remotefile)
-        if event == ClientEvent.CLIENTEVENT_CMD_FILE_REMOVE:
-            self.onCmdFileRemove(msg.remotefile)
-        if event == ClientEvent.CLIENTEVENT_USER_RECORD_MEDIAFILE:
-            self.onUserRecordMediaFile(msg.nSource, msg.mediafileinfo)
-        if event == ClientEvent.CLIENTEVENT_CMD_USERACCOUNT_NEW:
-            self.onUserAccountNew(msg.useraccount)
-        if event == ClientEvent.CLIENTEVENT_CMD_USERACCOUNT_REMOVE:
-            self.onUserAccountRemove(msg.useraccount)
-        if event == ClientEvent.CLIENTEVENT_USER_STATECHANGE:
-            self.onUserStateChange(msg.user)
-        if event == ClientEvent.CLIENTEVENT_USER_AUDIOBLOCK:
-            self.onUserAudioBlock(msg.nSource, msg.nStreamType)
-        if event == ClientEvent.CLIENTEVENT_STREAM_MEDIAFILE:
-            self.onStreamMediaFile(msg.mediafileinfo)
-        if event == ClientEvent.CLIENTEVENT_CMD_USERACCOUNT:
-            self.onUserAccount(msg.useraccount)
-        if event == ClientEvent.CLIENTEVENT_CMD_BANNEDUSER:
-            self.onBannedUser(msg.banneduser)
-        if event == ClientEvent.CLIENTEVENT_CMD_SERVERSTATISTICS:
-            self.onServerStatistics(msg.serverstatistics)
-        if event == ClientEvent.CLIENTEVENT_INTERNAL_ERROR:
-            self.onInternalError(msg.clienterrormsg)
-        if event == ClientEvent.CLIENTEVENT_SOUNDDEVICE_ADDED:
-            self.onSoundDeviceAdded(msg.sounddevice)
-        if event == ClientEvent.CLIENTEVENT_SOUNDDEVICE_REMOVED:
-            self.onSoundDeviceRemoved(msg.sounddevice)
-        if event == ClientEvent.CLIENTEVENT_SOUNDDEVICE_UNPLUGGED:
-            self.onSoundDeviceUnplugged(msg.sounddevice)
-        if event == ClientEvent.CLIENTEVENT_SOUNDDEVICE_NEW_DEFAULT_INPUT:
-            self.onSoundDeviceNewDefaultInput(msg.sounddevice)
-        if event == ClientEvent.CLIENTEVENT_SOUNDDEVICE_NEW_DEFAULT_OUTPUT:
-            self.onSoundDeviceNewDefaultOutput(msg.sounddevice)
-        if event == ClientEvent.CLIENTEVENT_SOUNDDEVICE_NEW_DEFAULT_INPUT_COMDEVICE:
-            self.onSoundDeviceNewDefaultInputComDevice(msg.sounddevice)
-        if event == ClientEvent.CLIENTEVENT_SOUNDDEVICE_NEW_DEFAULT_OUTPUT_COMDEVICE:
-            self.onSoundDeviceNewDefaultOutputComDevice(msg.sounddevice)
+    def runEventLoop(self, nWaitMSec = -1, nMaxMessages = 1):
+        # Waits up to nWaitMSec for the first event, then drains up to
+        # nMaxMessages - 1 further pending events without waiting. Events
+        # are decoded into a preallocated TTMessage, so structs passed to
+        # the on*() callbacks are only valid until the callback returns.
+        msg, wait = self._msg, self._waitMSec
+        wait.value = nWaitMSec
+        dispatch = self._dispatch
+        handled = 0
+        while handled < nMaxMessages and self._tt:
+            if not _GetMessage(self._tt, byref(msg), byref(wait)):
+                break
+            handled += 1
+            entry = dispatch.get(msg.nClientEvent)
+            if entry is not None:
+                handler, extract = entry
+                handler(*extract(msg))
+            wait.value = 0
+        return handled
+
+    def _buildDispatchTable(self):
+        # Maps each event code to (bound handler, field extractor); built once per instance
+        E = ClientEvent
+        no_args = lambda m: ()
+        source = lambda m: (m.nSource,)
+        user = lambda m: (m.user,)
+        useraccount = lambda m: (m.useraccount,)
+        channel = lambda m: (m.channel,)
+        remotefile = lambda m: (m.remotefile,)
+        clienterrormsg = lambda m: (m.clienterrormsg,)
+        sounddevice = lambda m: (m.sounddevice,)
+        return {
+            E.CLIENTEVENT_CON_SUCCESS: (self.onConnectSuccess, no_args),
+            E.CLIENTEVENT_CON_CRYPT_ERROR: (self.onConnectCryptError, clienterrormsg),
+            E.CLIENTEVENT_CON_FAILED: (self.onConnectFailed, no_args),
+            E.CLIENTEVENT_CON_LOST: (self.onConnectionLost, no_args),
+            E.CLIENTEVENT_CMD_PROCESSING: (self.onCmdProcessing, lambda m: (m.nSource, not m.bActive)),
+            E.CLIENTEVENT_CMD_ERROR: (self.onCmdError, lambda m: (m.nSource, m.clienterrormsg)),
+            E.CLIENTEVENT_CMD_SUCCESS: (self.onCmdSuccess, source),
+            E.CLIENTEVENT_CMD_MYSELF_LOGGEDIN: (self.onCmdMyselfLoggedIn, lambda m: (m.nSource, m.useraccount)),
+            E.CLIENTEVENT_CMD_MYSELF_LOGGEDOUT: (self.onCmdMyselfLoggedOut, no_args),
+            E.CLIENTEVENT_CMD_MYSELF_KICKED: (self.onCmdMyselfKickedFromChannel, lambda m: (m.nSource, m.user)),
+            E.CLIENTEVENT_CMD_USER_LOGGEDIN: (self.onCmdUserLoggedIn, user),
+            E.CLIENTEVENT_CMD_USER_LOGGEDOUT: (self.onCmdUserLoggedOut, user),
+            E.CLIENTEVENT_CMD_USER_UPDATE: (self.onCmdUserUpdate, user),
+            E.CLIENTEVENT_CMD_USER_JOINED: (self.onCmdUserJoinedChannel, user),
+            E.CLIENTEVENT_CMD_USER_LEFT: (self.onCmdUserLeftChannel, lambda m: (m.nSource, m.user)),
+            E.CLIENTEVENT_CMD_USER_TEXTMSG: (self.onCmdUserTextMessage, lambda m: (m.textmessage,)),
+            E.CLIENTEVENT_CMD_CHANNEL_NEW: (self.onCmdChannelNew, channel),
+            E.CLIENTEVENT_CMD_CHANNEL_UPDATE: (self.onCmdChannelUpdate, channel),
+            E.CLIENTEVENT_CMD_CHANNEL_REMOVE: (self.onCmdChannelRemove, channel),
+            E.CLIENTEVENT_CMD_SERVER_UPDATE: (self.onCmdServerUpdate, lambda m: (m.serverproperties,)),
+            E.CLIENTEVENT_CMD_FILE_NEW: (self.onCmdFileNew, remotefile),
+            E.CLIENTEVENT_CMD_FILE_REMOVE: (self.onCmdFileRemove, remotefile),
+            E.CLIENTEVENT_USER_RECORD_MEDIAFILE: (self.onUserRecordMediaFile, lambda m: (m.nSource, m.mediafileinfo)),
+            E.CLIENTEVENT_CMD_USERACCOUNT_NEW: (self.onUserAccountNew, useraccount),
+            E.CLIENTEVENT_CMD_USERACCOUNT_REMOVE: (self.onUserAccountRemove, useraccount),
+            E.CLIENTEVENT_USER_STATECHANGE: (self.onUserStateChange, user),
+            E.CLIENTEVENT_USER_AUDIOBLOCK: (self.onUserAudioBlock, lambda m: (m.nSource, m.nStreamType)),
+            E.CLIENTEVENT_STREAM_MEDIAFILE: (self.onStreamMediaFile, lambda m: (m.mediafileinfo,)),
+            E.CLIENTEVENT_CMD_USERACCOUNT: (self.onUserAccount, useraccount),
+            E.CLIENTEVENT_CMD_BANNEDUSER: (self.onBannedUser, lambda m: (m.banneduser,)),
+            E.CLIENTEVENT_CMD_SERVERSTATISTICS: (self.onServerStatistics, lambda m: (m.serverstatistics,)),
+            E.CLIENTEVENT_INTERNAL_ERROR: (self.onInternalError, clienterrormsg),
+            E.CLIENTEVENT_SOUNDDEVICE_ADDED: (self.onSoundDeviceAdded, sounddevice),
+            E.CLIENTEVENT_SOUNDDEVICE_REMOVED: (self.onSoundDeviceRemoved, sounddevice),
+            E.CLIENTEVENT_SOUNDDEVICE_UNPLUGGED: (self.onSoundDeviceUnplugged, sounddevice),
+            E.CLIENTEVENT_SOUNDDEVICE_NEW_DEFAULT_INPUT: (self.onSoundDeviceNewDefaultInput, sounddevice),
+            E.CLIENTEVENT_SOUNDDEVICE_NEW_DEFAULT_OUTPUT: (self.onSoundDeviceNewDefaultOutput, sounddevice),
+            E.CLIENTEVENT_SOUNDDEVICE_NEW_DEFAULT_INPUT_COMDEVICE: (self.onSoundDeviceNewDefaultInputComDevice, sounddevice),
+            E.CLIENTEVENT_SOUNDDEVICE_NEW_DEFAULT_OUTPUT_COMDEVICE: (self.onSoundDeviceNewDefaultOutputComDevice, sounddevice),
+        }
 
     def getMessage(self, nWaitMS: int = -1):
         msg = TTMessage()
@@ -0,0 +1,88 @@
+import collections
+import logging
+import threading
+import time
+
+class AIJobExecutor:
+    """Runs slow AI calls on a bounded set of worker threads and hands results back to the event loop.
+
+    Queued jobs are grouped by owner (a user or channel key) and workers take them round-robin
+    across owners, so one busy sender cannot starve everyone else.
+    """
+
+    def __init__(self, scheduler, max_workers: int = 4):
+        self.scheduler = scheduler
+        self.max_workers = max(1, int(max_workers))
+        self._queues = collections.OrderedDict() # owner -> deque of (enqueued_at, run); order is the round-robin turn
+        self._pending = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self.completed = 0
+        self.last_wait = self.max_wait = self.avg_wait = 0.0 # seconds spent queued
+        self._workers = [threading.Thread(target=self._worker, name=f"ai-worker_{i}", daemon=True) for i in range(self.max_workers)]
+        for worker in self._workers: worker.start()
+        logging.debug(f"AIJobExecutor initialized with {self.max_workers} workers.")
+
+    def submit(self, job, on_done, on_error=None, owner=None) -> bool:
+        """Runs job() on a worker thread, then on_done(result) on the event-loop thread."""
+        def run():
+            try:
+                result = job()
+            except Exception as e:
+                logging.error(f"AI job failed: {e}", exc_info=True)
+                if on_error:
+                    self.scheduler.call_soon(on_error, e)
+                return
+            self.scheduler.call_soon(on_done, result)
+
+        with self._cond:
+            if self._closed:
+                return False
+            self._queues.setdefault(owner, collections.deque()).append((time.monotonic(), run))
+            self._pending += 1
+            self._cond.notify()
+        return True
+
+    def _next_job(self):
+        # Caller holds the condition. Take from the owner at the front, then move it to the back.
+        owner, jobs = next(iter(self._queues.items()))
+        enqueued_at, run = jobs.popleft()
+        if jobs: self._queues.move_to_end(owner)
+        else: del self._queues[owner]
+        self._pending -= 1
+        wait = time.monotonic() - enqueued_at
+        self.last_wait, self.max_wait = wait, max(self.max_wait, wait)
+        self.avg_wait = wait if not self.completed else self.avg_wait * 0.9 + wait * 0.1
+        self.completed += 1
+        return run
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if self._closed: return
+                run = self._next_job()
+            run()
+
+    def get_stats(self) -> dict:
+        with self._cond:
+            return {
+                "workers": self.max_workers,
+                "queued": self._pending,
+                "queued_owners": len(self._queues),
+                "completed": self.completed,
+                "avg_wait": self.avg_wait,
+                "max_wait": self.max_wait,
+                "last_wait": self.last_wait,
+            }
+
+    def shutdown(self):
+        with self._cond:
+            if self._closed: return
+            self._closed = True
+            # Queued jobs are dropped; jobs already running finish in the background
+            self._queues.clear()
+            self._pending = 0
+            self._cond.notify_all()
+        logging.debug("AIJobExecutor shut down.")
@@ -1,49 +1,69 @@
 
 import sys, time, random, re
+import sqlite3
 try:
     import wx
 except ImportError:
     wx = None
 import logging # Re-add logging import for constants
 from TeamTalk5 import (
-    TeamTalk, TeamTalkError, TextMsgType, UserRight, TT_STRLEN,
-    ttstr, buildTextMessage, ClientError, ClientFlags
+    TeamTalk, TeamTalkError, TextMsgType, UserRight,
+    ttstr, iterTextMessages, ClientError, ClientFlags
 )
-from config_manager import save_config
+from config_manager import config_writer
 from handlers import command_handler
 from services.gemini_service import GeminiService
+from services.response_cache import TTLCache
+from services.welcome_pool import WelcomePool
 from services.weather_service import WeatherService
 from services.hariku_service import HarikuService
 from context_history_manager import ContextHistoryManager
-from logger_config import bot_logger # Import the named logger
+from context_history_store import ContextHistoryStore
+from task_scheduler import TaskScheduler
+from ai_job_executor import AIJobExecutor
+from rate_limiter import RateLimiter, check_limits
+from outbound_queue import OutboundQueue
+from message_reassembly import MessageReassembler
+from user_roster import UserRoster, UserSnapshot
+from word_filter import WordFilter
+from logger_config import bot_logger, log_buffer # Import the named logger
 
 
 class MyTeamTalkBot(TeamTalk):
+    EVENT_BATCH_SIZE = 64 # Max TeamTalk events drained per wakeup before running scheduled tasks
+
     def __init__(self, config_dict, controller=None):
         super().__init__()
         self.logger = bot_logger # Use the named logger
-        self.config = config_dict
+        self.config = config_dict # Typed by config_manager.coerce_config; values below are read as-is
         self.controller = controller
         conn_conf, bot_conf = self.config.get('Connection', {}), self.config.get('Bot', {})
 
-        self.host, self.tcp_port = ttstr(conn_conf.get('host')), int(conn_conf.get('port'))
+        self.host, self.tcp_port = ttstr(conn_conf.get('host')), conn_conf['port']
         self.udp_port, self.nickname = self.tcp_port, ttstr(conn_conf.get('nickname'))
         self.status_message, self.username = ttstr(bot_conf.get('status_message')), ttstr(conn_conf.get('username'))
         self.password, self.target_channel_path = ttstr(conn_conf.get('password')), ttstr(conn_conf.get('channel'))
         self.channel_password, self.client_name = ttstr(conn_conf.get('channel_password')), ttstr(bot_conf.get('client_name'))
 
-        self.reconnect_delay_min = int(bot_conf.get('reconnect_delay_min'))
-        self.reconnect_delay_max = int(bot_conf.get('reconnect_delay_max'))
+        self.reconnect_delay_min = bot_conf['reconnect_delay_min']
+        self.reconnect_delay_max = bot_conf['reconnect_delay_max']
 
         self.filtered_words = {w.strip().lower() for w in bot_conf.get('filtered_words','').split(',') if w.strip()}
+        self.word_filter = WordFilter(self.filtered_words, normalize=bot_conf['filter_normalize'])
         self.admin_usernames_config = [n.strip().lower() for n in bot_conf.get('admin_usernames','').split(',') if n.strip()]
 
         self._logged_in = self._in_channel = self._running = self._intentional_stop = self.bot_locked = False
         self._my_user_id = self._target_channel_id = self._join_cmd_id = -1
         self._start_time = 0; self.my_rights = UserRight.USERRIGHT_NONE
-        self.admin_user_ids, self.blocked_commands = set(), set()
-        self._all_users_cache = [] # Cache for all users
-        self._text_message_buffer, self.polls, self.warning_counts = {}, {}, {}
+        self._reconnect_attempts, self._reconnect_task = 0, None
+        self.blocked_commands = set()
+        self.roster = UserRoster(self.admin_usernames_config) # Event-fed user cache with nick/username indexes
+        self.polls, self.warning_counts = {}, {}
+        self._saved_config = self._persisted_view(self.config) # What config.ini holds as far as this bot knows
+        self.inbound = MessageReassembler(
+            max_message_bytes=bot_conf['inbound_max_message_bytes'],
+            fragment_timeout=bot_conf['inbound_fragment_timeout_seconds']
+        )
         self.next_poll_id = 1; self.main_window = None
 
         self.announce_join_leave = self.allow_channel_messages = self.allow_broadcast = True
@@ -51,32 +71,95 @@ class MyTeamTalkBot(TeamTalk):
         self.welcome_message_mode, self.filter_enabled = "template", bool(self.filtered_words)
         self.UNBLOCKABLE_COMMANDS = {'h','q','rs','block','unblock','info','whoami','rights','lock','tfilter','tgmmode'}
 
-        self.context_history_enabled = bot_conf.get('context_history_enabled', True)
-        self.debug_logging_enabled = bot_conf.get('debug_logging_enabled', False) # New attribute for debug logging
+        self.context_history_enabled = bot_conf['context_history_enabled']
+        self.gemini_streaming_enabled = bot_conf['gemini_streaming_enabled']
+        self.debug_logging_enabled = bot_conf['debug_logging_enabled'] # New attribute for debug logging
         self.ai_system_instructions = bot_conf.get('ai_system_instructions', '') # New attribute for AI system instructions
         self.welcome_message_instructions = bot_conf.get('welcome_message_instructions', '') # New attribute for welcome message instructions
         self.hariku_service = HarikuService(bot_conf.get('hariku_api_key'))
         self.gemini_service = GeminiService(
             api_key=bot_conf.get('gemini_api_key'),
             context_history_enabled=self.context_history_enabled,
-            model_name=bot_conf.get('gemini_model_name', 'gemini-1.5-flash-latest'),
+            model_name=bot_conf['gemini_model_name'],
             system_instructions=self.ai_system_instructions,
             welcome_instructions=self.welcome_message_instructions,
-            hariku_service=self.hariku_service
+            hariku_service=self.hariku_service,
+            response_cache=self._create_gemini_cache(bot_conf),
+            history_char_budget=bot_conf['gemini_history_max_chars'],
+            summarize_history=bot_conf['gemini_history_summarize']
+        )
+        self.weather_service = WeatherService(
+            bot_conf.get('weather_api_key'),
+            cache_ttl=bot_conf['weather_cache_ttl_seconds'],
+            cache_max_entries=bot_conf['weather_cache_max_entries']
         )
-        self.weather_service = WeatherService(bot_conf.get('weather_api_key'))
         
         self.context_history_manager = ContextHistoryManager(
-            retention_minutes=bot_conf.get('context_history_retention_minutes', 60),
-            max_messages=bot_conf.get('context_history_max_messages', 20)
+            retention_minutes=bot_conf['context_history_retention_minutes'],
+            max_messages=bot_conf['context_history_max_messages'],
+            max_keys=bot_conf['context_history_max_keys'],
+            sweep_interval=bot_conf['context_history_sweep_interval_seconds'],
+            store=self._create_history_store(bot_conf)
         )
         if not self.gemini_service.is_enabled(): self.allow_gemini_pm = self.allow_gemini_channel = False
+
+        # AI requests run off the event-loop thread; replies come back through the task scheduler
+        self.task_scheduler = TaskScheduler()
+        self.outbound = OutboundQueue(
+            messages_per_second=bot_conf['outbound_messages_per_second'],
+            destination_interval=bot_conf['outbound_destination_interval_ms'] / 1000,
+            max_pending=bot_conf['outbound_max_pending'],
+            packetize=self._packetize_outbound
+        )
+        self.ai_executor = AIJobExecutor(self.task_scheduler, max_workers=bot_conf['ai_worker_threads'])
+        self.ai_user_limiter = RateLimiter(bot_conf['ai_user_rate_per_minute'], bot_conf['ai_user_burst'])
+        self.ai_channel_limiter = RateLimiter(bot_conf['ai_channel_rate_per_minute'], bot_conf['ai_channel_burst'])
+        self.welcome_pool = WelcomePool(
+            self.gemini_service.generate_welcome_templates,
+            lambda job, on_done, on_error: self.submit_ai_job(job, on_done, on_error, owner="welcome"),
+            size=bot_conf['welcome_pool_size'],
+            low_watermark=bot_conf['welcome_pool_low_watermark']
+        )
         self._apply_debug_logging_setting() # Apply initial setting
+        log_buffer.resize(bot_conf['log_buffer_size']) # setup_logging() only runs once per process, not per restart
+
+    @staticmethod
+    def _create_history_store(bot_conf):
+        if not bot_conf['context_history_persist']: return None
+        try:
+            return ContextHistoryStore(
+                bot_conf['context_history_db_path'] or 'context_history.db',
+                retention_minutes=bot_conf['context_history_retention_minutes'],
+                max_messages=bot_conf['context_history_max_messages']
+            )
+        except sqlite3.Error as e:
+            logging.error(f"Could not open context history store: {e}. History will be kept in memory only.")
+            return None
+
+    @staticmethod
+    def _create_gemini_cache(bot_conf):
+        if not bot_conf['gemini_cache_enabled']: return None
+        return TTLCache(
+            max_entries=bot_conf['gemini_cache_max_entries'],
+            default_ttl=bot_conf['gemini_cache_ttl_seconds'],
+            max_bytes=bot_conf['gemini_cache_max_bytes'],
+            sizeof=lambda result: len(result[0].encode('utf-8')),
+            name="gemini_cache"
+        )
+
+    def _load_gemini_model(self, model_name) -> bool:
+        # Loads the model without saving; if it fails, the previously loaded model is restored
+        previous = self.gemini_service.get_current_model_name() if self.gemini_service.is_enabled() else None
+        self.gemini_service.init_model(model_name)
+        if self.gemini_service.uses_model(model_name):
+            self.welcome_pool.invalidate()
+            return True
+        if previous: self.gemini_service.init_model(previous)
+        return False
 
     def set_gemini_model(self, new_model_name):
         self._log_to_gui(f"Attempting to set Gemini model to: {new_model_name}")
-        self.gemini_service.init_model(new_model_name)
-        if self.gemini_service.is_enabled() and self.gemini_service.get_current_model_name() == new_model_name:
+        if self._load_gemini_model(new_model_name):
             self.config['Bot']['gemini_model_name'] = new_model_name
             self._save_runtime_config()
             self._log_to_gui(f"Gemini model successfully set to {new_model_name}.")
@@ -97,8 +180,134 @@ class MyTeamTalkBot(TeamTalk):
         self.config['Bot']['welcome_message_instructions'] = instructions
         self._save_runtime_config()
         self.gemini_service.set_welcome_instructions(instructions)
+        self.welcome_pool.invalidate()
+        if self.welcome_message_mode == "gemini": self.welcome_pool.ensure_filled()
+        return True
+
+    def _set_filtered_words(self, value):
+        self.filtered_words = {w.strip().lower() for w in value.split(',') if w.strip()}
+        self.word_filter.set_words(self.filtered_words)
+
+    def _set_admin_usernames(self, value):
+        self.admin_usernames_config = [n.strip().lower() for n in value.split(',') if n.strip()]
+        self.roster.set_admin_usernames(self.admin_usernames_config)
+
+    def _set_nickname(self, value):
+        self.nickname = ttstr(value)
+        if self._logged_in: self.doChangeNickname(self.nickname)
+
+    def _set_status_message(self, value):
+        self.status_message = ttstr(value)
+        if self._logged_in: self.doChangeStatus(0, self.status_message)
+
+    def _set_debug_logging(self, value):
+        self.debug_logging_enabled = value
+        self._apply_debug_logging_setting()
+
+    def _apply_gemini_model(self, value):
+        if self._load_gemini_model(value): return
+        # Show the model that is actually loaded; the next runtime save writes it back to config.ini
+        current = self.gemini_service.get_current_model_name()
+        self.config['Bot']['gemini_model_name'] = current
+        self._log_to_gui(f"[Error] Failed to load Gemini model {value}; still using {current}.")
+
+    def _set_context_history_enabled(self, value):
+        self.context_history_enabled = self.gemini_service.context_history_enabled = value
+
+    def _set_welcome_instructions(self, value):
+        self.welcome_message_instructions = value
+        self.gemini_service.set_welcome_instructions(value)
+        self.welcome_pool.invalidate()
+        if self.welcome_message_mode == "gemini": self.welcome_pool.ensure_filled()
+
+    def _set_weather_api_key(self, value):
+        self.weather_service.api_key = value
+        self.weather_service._enabled = bool(value) and self.weather_service.session is not None
+        self.weather_service.cache.clear()
+
+    def _reconfigure_outbound(self, bot_conf):
+        self.outbound.configure(bot_conf['outbound_messages_per_second'], bot_conf['outbound_destination_interval_ms'] / 1000, bot_conf['outbound_max_pending'])
+
+    # Keys a running bot can pick up in place: (section, key) -> apply(bot, new_value, new_bot_section).
+    # Everything else (server, credentials, worker threads, caches, storage...) needs a restart.
+    LIVE_CONFIG = {
+        ('Connection', 'nickname'): lambda bot, v, conf: bot._set_nickname(v),
+        ('Bot', 'status_message'): lambda bot, v, conf: bot._set_status_message(v),
+        ('Bot', 'admin_usernames'): lambda bot, v, conf: bot._set_admin_usernames(v),
+        ('Bot', 'filtered_words'): lambda bot, v, conf: bot._set_filtered_words(v),
+        ('Bot', 'filter_normalize'): lambda bot, v, conf: bot.word_filter.set_normalize(v, bot.filtered_words),
+        ('Bot', 'reconnect_delay_min'): lambda bot, v, conf: setattr(bot, 'reconnect_delay_min', v),
+        ('Bot', 'reconnect_delay_max'): lambda bot, v, conf: setattr(bot, 'reconnect_delay_max', v),
+        ('Bot', 'debug_logging_enabled'): lambda bot, v, conf: bot._set_debug_logging(v),
+        ('Bot', 'log_buffer_size'): lambda bot, v, conf: log_buffer.resize(v),
+        ('Bot', 'context_history_enabled'): lambda bot, v, conf: bot._set_context_history_enabled(v),
+        ('Bot', 'context_history_retention_minutes'): lambda bot, v, conf: bot.context_history_manager.set_retention_minutes(v),
+        ('Bot', 'context_history_max_messages'): lambda bot, v, conf: bot.context_history_manager.set_max_messages(v),
+        ('Bot', 'ai_system_instructions'): lambda bot, v, conf: bot.set_ai_system_instructions(v),
+        ('Bot', 'welcome_message_instructions'): lambda bot, v, conf: bot._set_welcome_instructions(v),
+        ('Bot', 'gemini_model_name'): lambda bot, v, conf: bot._apply_gemini_model(v),
+        ('Bot', 'gemini_history_max_chars'): lambda bot, v, conf: setattr(bot.gemini_service, 'history_char_budget', max(0, v)),
+        ('Bot', 'gemini_history_summarize'): lambda bot, v, conf: setattr(bot.gemini_service, 'summarize_history', v),
+        ('Bot', 'gemini_streaming_enabled'): lambda bot, v, conf: setattr(bot, 'gemini_streaming_enabled', v),
+        ('Bot', 'weather_api_key'): lambda bot, v, conf: bot._set_weather_api_key(v),
+        ('Bot', 'weather_cache_ttl_seconds'): lambda bot, v, conf: setattr(bot.weather_service.cache, 'default_ttl', float(v)),
+        ('Bot', 'ai_user_rate_per_minute'): lambda bot, v, conf: bot.ai_user_limiter.configure(v, conf['ai_user_burst']),
+        ('Bot', 'ai_user_burst'): lambda bot, v, conf: bot.ai_user_limiter.configure(conf['ai_user_rate_per_minute'], v),
+        ('Bot', 'ai_channel_rate_per_minute'): lambda bot, v, conf: bot.ai_channel_limiter.configure(v, conf['ai_channel_burst']),
+        ('Bot', 'ai_channel_burst'): lambda bot, v, conf: bot.ai_channel_limiter.configure(conf['ai_channel_rate_per_minute'], v),
+        ('Bot', 'outbound_messages_per_second'): lambda bot, v, conf: bot._reconfigure_outbound(conf),
+        ('Bot', 'outbound_destination_interval_ms'): lambda bot, v, conf: bot._reconfigure_outbound(conf),
+        ('Bot', 'outbound_max_pending'): lambda bot, v, conf: bot._reconfigure_outbound(conf),
+        ('Bot', 'inbound_max_message_bytes'): lambda bot, v, conf: setattr(bot.inbound, 'max_message_bytes', max(1, v)),
+        ('Bot', 'inbound_fragment_timeout_seconds'): lambda bot, v, conf: setattr(bot.inbound, 'fragment_timeout', float(v)),
+        ('Bot', 'welcome_pool_size'): lambda bot, v, conf: bot.welcome_pool.configure(v, conf['welcome_pool_low_watermark']),
+        ('Bot', 'welcome_pool_low_watermark'): lambda bot, v, conf: bot.welcome_pool.configure(conf['welcome_pool_size'], v),
+    }
+
+    def apply_config(self, new_config) -> list:
+        """Applies a typed config to the running bot.
+
+        Returns the changed keys that need a restart; if there are any, nothing is applied and the
+        caller should restart. Otherwise the changes are applied in place on the event-loop thread.
+        """
+        # Only the restart decision is made here, on the caller's thread. Live keys are diffed in
+        # _apply_live_config, on the event loop, where toggles and admin commands also change them.
+        restart_keys = [f"{section}.{key}" for section, values in new_config.items() if section != 'WebUI'
+                        for key, value in values.items()
+                        if (section, key) not in self.LIVE_CONFIG and self.config.get(section, {}).get(key) != value]
+        if not restart_keys:
+            self.task_scheduler.call_soon(self._apply_live_config, new_config)
+        return restart_keys
+
+    def _apply_live_config(self, new_config):
+        changes = [(section, key, value) for section, values in new_config.items() if section != 'WebUI'
+                   for key, value in values.items() if (section, key) in self.LIVE_CONFIG and self.config.get(section, {}).get(key) != value]
+        self.config = new_config
+        self._saved_config = self._persisted_view(new_config) # It was just read back from config.ini
+        for section, key, value in changes:
+            try:
+                self.LIVE_CONFIG[(section, key)](self, value, new_config['Bot'])
+            except Exception as e:
+                logging.error(f"Failed to apply {section}.{key} live: {e}", exc_info=True)
+        if changes: self._log_to_gui(f"Applied config changes without restart: {', '.join(key for _, key, _ in changes)}")
+        self._publish_status()
+
+    def check_ai_rate_limit(self, user_id, channel_id=None) -> float:
+        """Returns 0 if the user (and channel) may make an AI request now, else seconds to wait."""
+        limits = [(self.ai_user_limiter, user_id)]
+        if channel_id is not None: limits.append((self.ai_channel_limiter, channel_id))
+        return check_limits(limits)
+
+    def submit_ai_job(self, job, on_done, on_error=None, owner=None):
+        if not self.ai_executor.submit(job, on_done, on_error, owner=owner):
+            self._log_to_gui("[Warn] AI job rejected: executor is shut down.")
+            return False
         return True
 
+    def _publish_status(self):
+        # Pushes the new state to web UI listeners; unchanged states are not re-sent
+        if self.controller: self.controller.publish_status()
+
     def set_main_window(self, window): self.main_window = window; self._log_to_gui("GUI window linked.")
     def _log_to_gui(self, msg):
         if self.main_window and wx and hasattr(wx, 'CallAfter'):
@@ -106,11 +315,11 @@ class MyTeamTalkBot(TeamTalk):
         else:
             # When in non-GUI mode, just log to the standard logger
             self.logger.info(f"[Bot] {msg}")
-    def _send_pm(self, to_id, msg): self._send_text_message(msg, TextMsgType.MSGTYPE_USER, nToUserID=to_id)
-    def _send_channel_message(self, chan_id, msg): return self._send_text_message(msg, TextMsgType.MSGTYPE_CHANNEL, nChannelID=chan_id)
+    def _send_pm(self, to_id, msg, record_history=True, priority=None): self._send_text_message(msg, TextMsgType.MSGTYPE_USER, record_history=record_history, priority=priority, nToUserID=to_id)
+    def _send_channel_message(self, chan_id, msg, record_history=True, priority=None): return self._send_text_message(msg, TextMsgType.MSGTYPE_CHANNEL, record_history=record_history, priority=priority, nChannelID=chan_id)
     def _send_broadcast(self, msg): return self._send_text_message(msg, TextMsgType.MSGTYPE_BROADCAST)
 
-    def _send_text_message(self, message, msg_type, **kwargs):
+    def _send_text_message(self, message, msg_type, record_history=True, priority=None, **kwargs):
         if not message: return False
         is_chan = msg_type == TextMsgType.MSGTYPE_CHANNEL
         if (is_chan and (self.bot_locked or not self.allow_channel_messages)) or \
@@ -124,68 +333,75 @@ class MyTeamTalkBot(TeamTalk):
         elif msg_type == TextMsgType.MSGTYPE_CHANNEL and 'nChannelID' in kwargs:
             user_id = str(kwargs['nChannelID'])
 
-        # Split the message into chunks that fit within TeamTalk's message length limit
-        # TeamTalk's buildTextMessage also splits, but this pre-splitting handles very long messages more robustly
-        message_chunks = self._split_message(message, max_len=TT_STRLEN - 1) # Use TT_STRLEN from TeamTalk5
-
-        for chunk in message_chunks:
-            # buildTextMessage returns an iterable of textmessage objects
-            for msg_part_obj in buildTextMessage(chunk, msg_type, **kwargs):
-                if self.doTextMessage(msg_part_obj) == 0: # doTextMessage expects a textmessage object
-                    self._log_to_gui(f"[Error] Failed to send message part.");
-                    return False
+        # Split into TextMessages and paced out by the event loop; see _packetize_outbound
+        destination = (msg_type, kwargs.get('nToUserID', 0), kwargs.get('nChannelID', 0))
+        if not self.outbound.enqueue(destination, message, priority):
+            self._log_to_gui(f"[Warn] Outbound queue full, message dropped.")
+            return False
 
-        if user_id:
+        if user_id and record_history:
             self.context_history_manager.add_message(user_id, message, self.nickname, is_bot=True)
         return True
 
-    def _split_message(self, message, max_len=512):
-        """Splits a message into chunks no longer than max_len."""
-        if not message: return []
-        if len(message) <= max_len: return [message]
+    @staticmethod
+    def _packetize_outbound(destination, text):
+        msg_type, to_user_id, channel_id = destination
+        # Each piece is a message of its own, split at line or word boundaries to fit TT_STRLEN
+        return iterTextMessages(text, msg_type, nToUserID=to_user_id, nChannelID=channel_id, bChain=False)
 
-        chunks = []
-        current_chunk = ""
-        words = message.split(' ')
-        
-        for word in words:
-            if len(current_chunk) + len(word) + 1 <= max_len:
-                if current_chunk: current_chunk += ' '
-                current_chunk += word
-            else:
-                chunks.append(current_chunk)
-                current_chunk = word
-        if current_chunk: chunks.append(current_chunk)
-        return chunks
-
-    def _update_admin_ids(self):
-        all_users = self.getServerUsers() or []
-        self._all_users_cache = all_users # Update the cache
-        self.admin_user_ids = {u.nUserID for u in all_users if ttstr(u.szUsername).lower() in self.admin_usernames_config}
-        if ttstr(self.username).lower() in self.admin_usernames_config: self.admin_user_ids.add(self._my_user_id)
+    def _deliver_outbound(self, destination, textmessage):
+        if self.doTextMessage(textmessage) == 0:
+            self._log_to_gui(f"[Error] Failed to send message part.")
+            return False
+        return True
+
+    @property
+    def admin_user_ids(self): return self.roster.admin_user_ids
+
+    def _sync_roster(self):
+        # Full resync, only needed once per login; user events keep the roster current afterwards
+        self.roster.reset(self.getServerUsers())
         self._log_to_gui(f"Resolved Admin IDs: {self.admin_user_ids or 'None'}")
 
-    def _is_admin(self, user_id): return user_id in self.admin_user_ids
-    def _find_user_by_nick(self, nick):
-        target_nick = ttstr(nick).lower()
-        try:
-            return next((u for u in self.getServerUsers() if ttstr(u.szNickname).lower() == target_nick), None)
-        except TeamTalkError as e:
-            if e.errnum != ClientError.CMDERR_NOT_LOGGEDIN: self.logger.error(f"SDK error in _find_user_by_nick: {e}"); return None
+    def _rebuild_word_filter(self): self.word_filter.set_words(self.filtered_words)
+
+    def _is_admin(self, user_id): return user_id in self.roster.admin_user_ids
+    def _find_user_by_nick(self, nick): return self.roster.find_by_nick(nick)
+
+    def get_user_snapshot(self, user_id):
+        # Roster first; only users we haven't seen an event for yet cost an SDK call
+        snapshot = self.roster.get(user_id)
+        if snapshot is None:
+            user = self.getUser(user_id)
+            if user and user.nUserID == user_id: snapshot = self.roster.upsert(user)
+        return snapshot
+    @staticmethod
+    def _persisted_view(config):
+        return {section: dict(config.get(section, {})) for section in ('Connection', 'Bot')}
     def _save_runtime_config(self, save_gemini_key=False, save_hariku_key=False):
-        self._log_to_gui("Saving runtime config..."); self.config['Bot']['filtered_words'] = ','.join(sorted(list(self.filtered_words)))
+        self.config['Bot']['filtered_words'] = ','.join(sorted(list(self.filtered_words)))
         self.config['Connection']['nickname'] = ttstr(self.nickname); self.config['Bot']['status_message'] = ttstr(self.status_message)
         if save_gemini_key: self.config['Bot']['gemini_api_key'] = self.gemini_service.api_key
         if save_hariku_key: self.config['Bot']['hariku_api_key'] = self.hariku_service.api_key
-        save_config(self.config)
+        # Only keys changed since the last save are queued; the writer merges them onto the file as it is then
+        changes = {}
+        for section, saved in self._saved_config.items():
+            for key, value in self.config.get(section, {}).items():
+                if key not in saved or saved[key] != value:
+                    changes.setdefault(section, {})[key] = saved[key] = value
+        config_writer.schedule(changes)
     def _mark_stopped_intentionally(self): self._intentional_stop = True
 
     def stop(self):
         if not self._running: return
         self._log_to_gui("Stop requested."); self._running = False; time.sleep(0.1)
+        self._cancel_reconnect(); self.ai_executor.shutdown(); self.task_scheduler.clear()
+        self.context_history_manager.close(); config_writer.flush()
         try:
             if self.getFlags() & ClientFlags.CLIENT_CONNECTED:
-                if self._logged_in: self.doLogout()
+                if self._logged_in:
+                    self.outbound.drain(self._deliver_outbound) # Best effort, e.g. the reply to 'q'
+                    self.doLogout()
                 self.disconnect()
         except TeamTalkError: pass
         finally: self.closeTeamTalk(); self._tt = None
@@ -196,7 +412,13 @@ class MyTeamTalkBot(TeamTalk):
         try:
             if not self.connect(self.host, self.tcp_port, self.udp_port): self._running = False; return
             self._log_to_gui("Connection started. Entering event loop.")
-            while self._running: self.runEventLoop(100)
+            while self._running:
+                # Wake up early when queued outbound messages become due
+                due = self.outbound.seconds_until_due()
+                self.runEventLoop(100 if due is None else min(100, int(due * 1000)), nMaxMessages=self.EVENT_BATCH_SIZE)
+                self.task_scheduler.run_pending()
+                self.outbound.drain(self._deliver_outbound)
+                self.inbound.expire() # A sender that stops mid-message doesn't hold its buffer until the next fragment
         except TeamTalkError as e: self._log_to_gui(f"[SDK Critical] Connection error: {e.errmsg}"); self._running = False
         finally: self.stop()
 
@@ -209,13 +431,35 @@ class MyTeamTalkBot(TeamTalk):
 
     def onConnectSuccess(self): self._log_to_gui("Connected. Logging in..."); self.doLogin(self.nickname, self.username, self.password, self.client_name)
     def onConnectFailed(self): self._log_to_gui("[Error] Connection failed."); self._handle_reconnect()
-    def onConnectionLost(self): self._log_to_gui("[Error] Connection lost."); self._logged_in = self._in_channel = False; self._handle_reconnect()
+    def onConnectionLost(self): self._log_to_gui("[Error] Connection lost."); self._logged_in = self._in_channel = False; self.roster.clear(); self.outbound.clear(); self.inbound.clear(); self._publish_status(); self._handle_reconnect()
     def _handle_reconnect(self):
-        if self._running and not self._intentional_stop:
-            delay = random.randint(self.reconnect_delay_min, self.reconnect_delay_max)
-            self._log_to_gui(f"Reconnecting in {delay}s..."); time.sleep(delay)
-            if self._running and not self._intentional_stop:
-                self._initiate_restart()
+        if not self._running or self._intentional_stop or self._reconnect_task: return
+        delay = self._next_reconnect_delay()
+        self._reconnect_attempts += 1
+        self._log_to_gui(f"Reconnecting in {delay:.1f}s (attempt {self._reconnect_attempts})...")
+        self._reconnect_task = self.task_scheduler.call_later(delay, self._attempt_reconnect)
+
+    def _next_reconnect_delay(self):
+        # Exponential backoff from reconnect_delay_min, capped at reconnect_delay_max, with jitter
+        base = max(1, self.reconnect_delay_min)
+        cap = max(base, self.reconnect_delay_max)
+        backoff = min(cap, base * (2 ** min(self._reconnect_attempts, 16)))
+        return random.uniform(base, backoff)
+
+    def _attempt_reconnect(self):
+        self._reconnect_task = None
+        if not self._running or self._intentional_stop: return
+        self._log_to_gui("Attempting to reconnect...")
+        self._logged_in = self._in_channel = False
+        try:
+            self.disconnect()
+            started = self.connect(self.host, self.tcp_port, self.udp_port)
+        except TeamTalkError as e:
+            self._log_to_gui(f"[SDK Error] Reconnect failed: {e}"); started = False
+        if not started: self._handle_reconnect()
+
+    def _cancel_reconnect(self):
+        if self._reconnect_task: self._reconnect_task.cancel(); self._reconnect_task = None
 
     def onCmdError(self, cmd_id, err):
         self._log_to_gui(f"[Cmd Error {cmd_id}] {err.nErrorNo} - {ttstr(err.szErrorMsg)}")
@@ -223,58 +467,69 @@ class MyTeamTalkBot(TeamTalk):
 
     def onCmdMyselfLoggedIn(self, user_id, user_acc):
         self._logged_in, self._my_user_id, self.my_rights = True, user_id, user_acc.uUserRights
+        self._reconnect_attempts = 0
         self._log_to_gui(f"Login success! My ID: {user_id}, Rights: {self.my_rights:#010x}")
         if self.main_window: wx.CallAfter(self.main_window.Show); wx.CallAfter(self.main_window.SetTitle, f"Bot - {ttstr(self.nickname)}"); wx.CallAfter(self.main_window.update_feature_list)
         if self.status_message: self.doChangeStatus(0, self.status_message)
-        self._update_admin_ids()
+        self._sync_roster(); self._publish_status()
         chan_id = self.getChannelIDFromPath(self.target_channel_path) or self.getRootChannelID()
         if chan_id > 0: self._target_channel_id = chan_id; self._join_cmd_id = self.doJoinChannelByID(chan_id, self.channel_password)
     
-    def onCmdMyselfLoggedOut(self): self._log_to_gui("Logged out."); self._logged_in = False
+    def onCmdMyselfLoggedOut(self): self._log_to_gui("Logged out."); self._logged_in = False; self.roster.clear(); self.outbound.clear(); self._publish_status()
+
+    def onCmdUserLoggedIn(self, user): self.roster.upsert(user)
+    def onCmdUserLoggedOut(self, user): self.roster.remove(user.nUserID)
     
     def onCmdUserJoinedChannel(self, user):
-        if user.nUserID == self._my_user_id: self._in_channel = True; self._log_to_gui(f"Joined channel ID: {user.nChannelID}")
+        user = self.roster.upsert(user)
+        if not user: return
+        if user.user_id == self._my_user_id: self._in_channel = True; self._log_to_gui(f"Joined channel ID: {user.channel_id}"); self._publish_status()
         else:
-            self._update_admin_ids() # Update admin IDs when a user joins
-            if self.announce_join_leave and user.nChannelID == self.getMyChannelID():
-                welcome_msg = self.gemini_service.generate_welcome_message(ttstr(user.szNickname)) if self.welcome_message_mode == "gemini" and self.gemini_service.is_enabled() else f"Welcome, {ttstr(user.szNickname)}!"
-                self._send_channel_message(user.nChannelID, welcome_msg)
+            if self.announce_join_leave and user.channel_id == self.getMyChannelID():
+                nickname = user.nickname
+                welcome_msg = None
+                if self.welcome_message_mode == "gemini" and self.gemini_service.is_enabled():
+                    welcome_msg = self.welcome_pool.take(nickname) # Falls back to the template while the pool refills
+                if not welcome_msg: welcome_msg = f"Welcome, {nickname}!"
+                self._send_channel_message(user.channel_id, welcome_msg)
     
     def onCmdUserLeftChannel(self, chan_id, user):
-        if user.nUserID == self._my_user_id: self._in_channel = False; self._log_to_gui("Left channel.")
+        user = self.roster.upsert(user)
+        if user and user.user_id == self._my_user_id: self._in_channel = False; self._log_to_gui("Left channel."); self._publish_status()
     
     def onCmdUserTextMessage(self, textmessage):
         if textmessage.nFromUserID == self._my_user_id or not self._logged_in: return
         key = (textmessage.nFromUserID, textmessage.nMsgType, textmessage.nChannelID)
-        self._text_message_buffer[key] = self._text_message_buffer.get(key, "") + ttstr(textmessage.szMessage)
-        if textmessage.bMore: return
-        full_msg = self._text_message_buffer.pop(key, "")
+        full_msg = self.inbound.add(key, textmessage.szMessage, textmessage.bMore)
         if not full_msg: return
         
+        sender = self.get_user_snapshot(textmessage.nFromUserID)
+        sender_nick = sender.nickname if sender else f"UserID_{textmessage.nFromUserID}"
+
         # Add incoming message to context history
         if textmessage.nMsgType == TextMsgType.MSGTYPE_USER:
-            sender_nick = ttstr(self.getUser(textmessage.nFromUserID).szNickname)
             self.context_history_manager.add_message(str(textmessage.nFromUserID), full_msg, sender_nick, is_bot=False)
 
         log_prefix = ""
         if textmessage.nMsgType == TextMsgType.MSGTYPE_CHANNEL: log_prefix=f"[{ttstr(self.getChannelPath(textmessage.nChannelID))}]"
         elif textmessage.nMsgType == TextMsgType.MSGTYPE_USER: log_prefix="[PM]"
-        self._log_to_gui(f"{log_prefix} <{ttstr(self.getUser(textmessage.nFromUserID).szNickname)}> {full_msg}")
+        self._log_to_gui(f"{log_prefix} <{sender_nick}> {full_msg}")
         
-        command_handler.handle_message(self, textmessage, full_msg)
+        command_handler.handle_message(self, textmessage, full_msg, sender_nick)
 
     def onCmdUserUpdate(self, user):
-        if user and user.nUserID == self._my_user_id:
-            if ttstr(user.szNickname) != self.nickname or ttstr(user.szStatusMsg) != self.status_message:
-                self.nickname = ttstr(user.szNickname); self.status_message = ttstr(user.szStatusMsg)
+        user = self.roster.upsert(user)
+        if user and user.user_id == self._my_user_id:
+            if user.nickname != self.nickname or user.status_msg != self.status_message:
+                self.nickname = user.nickname; self.status_message = user.status_msg
                 self._log_to_gui(f"My info updated: Nick='{self.nickname}', Status='{self.status_message}'")
-                self._save_runtime_config()
-        self._update_admin_ids() # Update admin IDs when a user updates
+                self._save_runtime_config(); self._publish_status()
 
     def toggle_feature(self, attr_name, on_msg, off_msg):
         setattr(self, attr_name, not getattr(self, attr_name))
         new_state = getattr(self, attr_name)
         self._log_to_gui(f"[Toggle] {on_msg if new_state else off_msg}")
+        self._publish_status()
         return new_state
     def toggle_announce_join_leave(self): self.toggle_feature('announce_join_leave', "JCL ON", "JCL OFF")
     def toggle_allow_channel_messages(self): self.toggle_feature('allow_channel_messages', "Chan Msgs ON", "Chan Msgs OFF")
@@ -301,5 +556,5 @@ class MyTeamTalkBot(TeamTalk):
     def toggle_debug_logging(self):
         self.debug_logging_enabled = not self.debug_logging_enabled
         self._apply_debug_logging_setting()
-        self.config['Bot']['debug_logging_enabled'] = str(self.debug_logging_enabled)
-        self._save_runtime_config()
+        self.config['Bot']['debug_logging_enabled'] = self.debug_logging_enabled
+        self._save_runtime_config(); self._publish_status()
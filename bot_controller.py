@@ -1,7 +1,8 @@
 import sys, threading, signal, time
-from config_manager import load_config, save_config, DEFAULT_CONFIG
+from config_manager import load_config, save_config, coerce_config, DEFAULT_CONFIG
 from bot import MyTeamTalkBot, TeamTalkError
 from logger_config import bot_logger, setup_logging # Import from new module
+from event_bus import event_bus
 
 # InteractiveShell dihapus karena tidak relevan untuk Web UI
 
@@ -111,6 +112,7 @@ class ApplicationController:
 
     def _bot_thread_func(self):
         try:
+            self.config = coerce_config(self.config) # Web UI edits may have left strings behind
             self.bot_instance = MyTeamTalkBot(self.config, self)
             # if not self.nogui: # Only set main_window if in GUI mode
             #     self.bot_instance.set_main_window(self.main_gui_window)
@@ -120,6 +122,73 @@ class ApplicationController:
         finally:
             self.logger.info("Bot thread finished execution.")
             self.bot_instance = None
+            self.publish_status()
+
+    @staticmethod
+    def _sanitize_for_json(value):
+        if hasattr(value, 'value'): # Handle ctypes objects (like c_uint, c_int)
+            return value.value
+        if isinstance(value, bytes):
+            return value.decode('utf-8', errors='ignore')
+        return value
+
+    def get_status(self) -> dict:
+        """Bot state as shown by the web UI; shared by /status and the /events stream."""
+        bot = self.bot_instance
+        if not bot:
+            return {"running": False}
+        running = bool(self.bot_thread and self.bot_thread.is_alive())
+        status = {
+            "running": running,
+            "logged_in": bot._logged_in,
+            "in_channel": bot._in_channel,
+            "features": {
+                "announce_join_leave": bot.announce_join_leave,
+                "allow_channel_messages": bot.allow_channel_messages,
+                "allow_broadcast": bot.allow_broadcast,
+                "allow_gemini_pm": bot.allow_gemini_pm,
+                "allow_gemini_channel": bot.allow_gemini_channel,
+                "filter_enabled": bot.filter_enabled,
+                "bot_locked": bot.bot_locked,
+                "context_history_enabled": bot.context_history_enabled,
+                "debug_logging_enabled": bot.debug_logging_enabled,
+            },
+        }
+        if running and bot._logged_in:
+            clean = self._sanitize_for_json
+            status["server_info"] = {
+                "host": clean(bot.host),
+                "tcp_port": bot.tcp_port,
+                "udp_port": bot.udp_port,
+                "nickname": clean(bot.nickname),
+                "username": clean(bot.username),
+                "target_channel_path": clean(bot.target_channel_path),
+                "my_user_id": bot._my_user_id,
+                "my_rights": clean(bot.my_rights),
+                "client_name": clean(bot.client_name),
+                "status_message": clean(bot.status_message),
+                "logged_in": bot._logged_in,
+                "in_channel": bot._in_channel,
+            }
+        return status
+
+    def publish_status(self):
+        # Retained: unchanged states are not re-sent, and new web UI listeners get the latest one
+        event_bus.publish("status", self.get_status(), retain=True)
+
+    def apply_config(self, new_config):
+        """Hands a saved config to the running bot, restarting only if a changed key requires it.
+
+        Returns the keys that forced a restart, [] if everything was applied live, or None if no bot is running.
+        """
+        self.config = coerce_config(new_config)
+        if not (self.bot_instance and self.bot_thread and self.bot_thread.is_alive()):
+            return None
+        restart_keys = self.bot_instance.apply_config(self.config)
+        if restart_keys:
+            self.logger.info(f"Config change needs a restart ({', '.join(restart_keys)}).")
+            self.request_restart()
+        return restart_keys
 
     def request_restart(self):
         
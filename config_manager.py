@@ -1,8 +1,14 @@
 
 import configparser
+import io
 import os
 import logging
 import secrets
+import stat
+import tempfile
+import threading
+import time
+from types import MappingProxyType
 from dotenv import load_dotenv, set_key
 
 CONFIG_FILE = "config.ini"
@@ -21,82 +27,180 @@ DEFAULT_CONFIG = {
         'admin_usernames': '',
         'gemini_api_key': '',
         'gemini_model_name': 'gemini-1.5-flash-latest',
+        'gemini_cache_enabled': 'False',
+        'gemini_cache_ttl_seconds': '3600',
+        'gemini_cache_max_entries': '256',
+        'gemini_cache_max_bytes': '1048576',
+        'gemini_history_max_chars': '8000',
+        'gemini_history_summarize': 'False',
+        'gemini_streaming_enabled': 'False',
         'status_message': '',
         'reconnect_delay_min': '5',
         'reconnect_delay_max': '15',
         'weather_api_key': '',
+        'weather_cache_ttl_seconds': '600',
+        'weather_cache_max_entries': '256',
         'hariku_api_key': '',
         'filtered_words': '',
+        'filter_normalize': 'False',
         'context_history_retention_minutes': '60',
         'context_history_max_messages': '40',
+        'context_history_max_keys': '5000',
+        'context_history_sweep_interval_seconds': '60',
+        'context_history_persist': 'False',
+        'context_history_db_path': 'context_history.db',
         'context_history_enabled': 'True',
         'debug_logging_enabled': 'False',
-        'ai_system_instructions': ''
+        'log_buffer_size': '2000',
+        'ai_system_instructions': '',
+        'ai_worker_threads': '4',
+        'ai_user_rate_per_minute': '6',
+        'ai_user_burst': '3',
+        'ai_channel_rate_per_minute': '20',
+        'ai_channel_burst': '5',
+        'outbound_messages_per_second': '4',
+        'outbound_destination_interval_ms': '300',
+        'outbound_max_pending': '300',
+        'inbound_max_message_bytes': '65536',
+        'inbound_fragment_timeout_seconds': '30',
+        'welcome_pool_size': '8',
+        'welcome_pool_low_watermark': '3'
     },
     'WebUI': {
         # 'secret_key': '' # Secret key is now managed via .env
     }
 }
 
-def load_config():
-    load_dotenv() # Load environment variables from .env
-
-    # Handle SECRET_KEY
-    secret_key = os.getenv('SECRET_KEY')
-    if not secret_key:
-        secret_key = secrets.token_hex(16)
-        set_key(os.path.join(os.getcwd(), '.env'), 'SECRET_KEY', secret_key) # Save to .env in current working directory
-        logging.info("Generated and saved a new SECRET_KEY to .env.")
-
-    config = configparser.ConfigParser()
-    if not os.path.exists(CONFIG_FILE):
-        logging.warning(f"{CONFIG_FILE} not found. Will prompt for setup.")
-        return None
-
+def _default_type(default: str):
+    if default in ('True', 'False'): return bool
     try:
-        config.read(CONFIG_FILE)
-        
-        if not config.has_section('Connection') or not config.has_section('Bot'):
-            logging.error(f"Config file {CONFIG_FILE} is missing required sections. Please fix or delete it.")
+        int(default)
+        return int
+    except ValueError:
+        return str
+
+# Value types are inferred once from the defaults: 'True'/'False' -> bool, digits -> number, else str
+CONFIG_TYPES = {section: {key: _default_type(default) for key, default in values.items()} for section, values in DEFAULT_CONFIG.items()}
+
+def _coerce(section: str, key: str, value):
+    kind = CONFIG_TYPES.get(section, {}).get(key, str)
+    if kind is bool:
+        return value if isinstance(value, bool) else str(value).strip().lower() == 'true'
+    if kind is int:
+        if isinstance(value, (int, float)) and not isinstance(value, bool): return value
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            try:
+                return float(value) # Rates and intervals may be fractional
+            except (TypeError, ValueError):
+                logging.error(f"Invalid value for {key}: {value!r}. Using default.")
+                return int(DEFAULT_CONFIG[section][key])
+    return value if isinstance(value, str) else ('' if value is None else str(value))
+
+def coerce_config(structured_config_data) -> dict:
+    """Returns a mutable copy with known keys typed and missing Connection/Bot keys filled from the defaults."""
+    typed = {section: {key: _coerce(section, key, value) for key, value in values.items()}
+             for section, values in (structured_config_data or {}).items()}
+    for section in ('Connection', 'Bot'):
+        values = typed.setdefault(section, {})
+        for key, default in DEFAULT_CONFIG[section].items():
+            if key not in values: values[key] = _coerce(section, key, default)
+    return typed
+
+def _freeze(structured_config_data):
+    return MappingProxyType({section: MappingProxyType(dict(values)) for section, values in structured_config_data.items()})
+
+_UNLOADED = object()
+
+class ConfigService:
+    """Parses config.ini once and serves typed, read-only snapshots.
+
+    The file is only re-read when its mtime or size changes (checked at most every check_interval
+    seconds). Readers never take a lock: a reload builds a new snapshot and swaps the reference.
+    """
+
+    def __init__(self, path: str = CONFIG_FILE, check_interval: float = 1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._snapshot = None
+        self._signature = _UNLOADED # (mtime_ns, size) of the file behind _snapshot, None if missing
+        self._checked_at = float('-inf')
+        self._secret_key = None
+        self._lock = threading.Lock()
+
+    def _file_signature(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _ensure_secret_key(self) -> str:
+        if self._secret_key is None:
+            load_dotenv() # Load environment variables from .env
+            secret_key = os.getenv('SECRET_KEY')
+            if not secret_key:
+                secret_key = secrets.token_hex(16)
+                set_key(os.path.join(os.getcwd(), '.env'), 'SECRET_KEY', secret_key) # Save to .env in current working directory
+                os.environ['SECRET_KEY'] = secret_key
+                logging.info("Generated and saved a new SECRET_KEY to .env.")
+            self._secret_key = secret_key
+        return self._secret_key
+
+    def get(self):
+        """Current read-only snapshot ({section: {key: value}}), or None if there is no usable config."""
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            signature = self._file_signature()
+            if signature != self._signature:
+                with self._lock:
+                    if signature != self._signature: self._reload(signature)
+        return self._snapshot
+
+    def load(self):
+        """Mutable, typed copy of the current snapshot for callers that edit and save it."""
+        snapshot = self.get()
+        return None if snapshot is None else {section: dict(values) for section, values in snapshot.items()}
+
+    def invalidate(self):
+        # Forces a stat on the next get(); the file is only re-parsed if it actually changed
+        self._checked_at = float('-inf')
+
+    def _reload(self, signature):
+        # _signature is only recorded once the snapshot for it is settled; if this raises, the next get() retries
+        self._snapshot = self._parse(signature)
+        self._signature = signature
+
+    def _parse(self, signature):
+        secret_key = self._ensure_secret_key()
+        if signature is None:
+            logging.warning(f"{self.path} not found. Will prompt for setup.")
+            return None
+
+        config = configparser.ConfigParser(interpolation=None) # Values are literal; '%' needs no escaping
+        try:
+            config.read(self.path)
+            if not config.has_section('Connection') or not config.has_section('Bot'):
+                logging.error(f"Config file {self.path} is missing required sections. Please fix or delete it.")
+                return None
+            structured_config = coerce_config({section: dict(config.items(section)) for section in config.sections()})
+        except configparser.Error as e:
+            logging.error(f"Error reading config file {self.path}: {e}. Please fix or delete it.")
             return None
-        
-        structured_config = {section: dict(config.items(section)) for section in config.sections()}
-        
         # Add SECRET_KEY to structured_config for internal use, but not saved to config.ini
-        if 'WebUI' not in structured_config:
-            structured_config['WebUI'] = {}
-        structured_config['WebUI']['secret_key'] = secret_key
+        structured_config.setdefault('WebUI', {})['secret_key'] = secret_key
+        logging.info(f"Loaded configuration from {self.path}")
+        return _freeze(structured_config)
 
-        # Ensure context_history_retention_minutes is an integer
-        if 'Bot' in structured_config and 'context_history_retention_minutes' in structured_config['Bot']:
-            try:
-                structured_config['Bot']['context_history_retention_minutes'] = int(structured_config['Bot']['context_history_retention_minutes'])
-            except ValueError:
-                logging.error("Invalid value for context_history_retention_minutes. Using default.")
-                structured_config['Bot']['context_history_retention_minutes'] = int(DEFAULT_CONFIG['Bot']['context_history_retention_minutes'])
-        else:
-            structured_config['Bot']['context_history_retention_minutes'] = int(DEFAULT_CONFIG['Bot']['context_history_retention_minutes'])
-
-        # Ensure context_history_enabled is a boolean
-        if 'Bot' in structured_config and 'context_history_enabled' in structured_config['Bot']:
-            structured_config['Bot']['context_history_enabled'] = structured_config['Bot']['context_history_enabled'].lower() == 'true'
-        else:
-            structured_config['Bot']['context_history_enabled'] = DEFAULT_CONFIG['Bot']['context_history_enabled'].lower() == 'true'
-
-        # Ensure debug_logging_enabled is a boolean
-        if 'Bot' in structured_config and 'debug_logging_enabled' in structured_config['Bot']:
-            structured_config['Bot']['debug_logging_enabled'] = structured_config['Bot']['debug_logging_enabled'].lower() == 'true'
-        else:
-            structured_config['Bot']['debug_logging_enabled'] = DEFAULT_CONFIG['Bot']['debug_logging_enabled'].lower() == 'true'
-
-        logging.info(f"Loaded configuration from {CONFIG_FILE}")
-        return structured_config
-    except configparser.Error as e:
-        logging.error(f"Error reading config file {CONFIG_FILE}: {e}. Please fix or delete it.")
-        return None
+config_service = ConfigService()
 
-def save_config(structured_config_data):
-    config = configparser.ConfigParser()
+def load_config():
+    return config_service.load()
+
+def _build_config(structured_config_data):
+    config = configparser.ConfigParser(interpolation=None) # Matches how config.ini is read back
     
     conn_data = structured_config_data.get('Connection', {})
     bot_data = structured_config_data.get('Bot', {})
@@ -117,25 +221,170 @@ def save_config(structured_config_data):
         'admin_usernames': bot_data.get('admin_usernames', ''),
         'gemini_api_key': bot_data.get('gemini_api_key', ''),
         'gemini_model_name': bot_data.get('gemini_model_name', DEFAULT_CONFIG['Bot']['gemini_model_name']),
+        'gemini_cache_enabled': str(bot_data.get('gemini_cache_enabled', DEFAULT_CONFIG['Bot']['gemini_cache_enabled'])).lower() == 'true',
+        'gemini_cache_ttl_seconds': str(bot_data.get('gemini_cache_ttl_seconds', DEFAULT_CONFIG['Bot']['gemini_cache_ttl_seconds'])),
+        'gemini_cache_max_entries': str(bot_data.get('gemini_cache_max_entries', DEFAULT_CONFIG['Bot']['gemini_cache_max_entries'])),
+        'gemini_cache_max_bytes': str(bot_data.get('gemini_cache_max_bytes', DEFAULT_CONFIG['Bot']['gemini_cache_max_bytes'])),
+        'gemini_history_max_chars': str(bot_data.get('gemini_history_max_chars', DEFAULT_CONFIG['Bot']['gemini_history_max_chars'])),
+        'gemini_history_summarize': str(bot_data.get('gemini_history_summarize', DEFAULT_CONFIG['Bot']['gemini_history_summarize'])).lower() == 'true',
+        'gemini_streaming_enabled': str(bot_data.get('gemini_streaming_enabled', DEFAULT_CONFIG['Bot']['gemini_streaming_enabled'])).lower() == 'true',
         'status_message': bot_data.get('status_message', ''),
         'reconnect_delay_min': str(bot_data.get('reconnect_delay_min', DEFAULT_CONFIG['Bot']['reconnect_delay_min'])),
         'reconnect_delay_max': str(bot_data.get('reconnect_delay_max', DEFAULT_CONFIG['Bot']['reconnect_delay_max'])),
         'weather_api_key': bot_data.get('weather_api_key', ''),
+        'weather_cache_ttl_seconds': str(bot_data.get('weather_cache_ttl_seconds', DEFAULT_CONFIG['Bot']['weather_cache_ttl_seconds'])),
+        'weather_cache_max_entries': str(bot_data.get('weather_cache_max_entries', DEFAULT_CONFIG['Bot']['weather_cache_max_entries'])),
         'hariku_api_key': bot_data.get('hariku_api_key', ''),
         'filtered_words': bot_data.get('filtered_words', ''),
+        'filter_normalize': str(bot_data.get('filter_normalize', DEFAULT_CONFIG['Bot']['filter_normalize'])).lower() == 'true',
         'context_history_retention_minutes': str(bot_data.get('context_history_retention_minutes', DEFAULT_CONFIG['Bot']['context_history_retention_minutes'])),
+        'context_history_max_messages': str(bot_data.get('context_history_max_messages', DEFAULT_CONFIG['Bot']['context_history_max_messages'])),
+        'context_history_max_keys': str(bot_data.get('context_history_max_keys', DEFAULT_CONFIG['Bot']['context_history_max_keys'])),
+        'context_history_sweep_interval_seconds': str(bot_data.get('context_history_sweep_interval_seconds', DEFAULT_CONFIG['Bot']['context_history_sweep_interval_seconds'])),
+        'context_history_persist': str(bot_data.get('context_history_persist', DEFAULT_CONFIG['Bot']['context_history_persist'])).lower() == 'true',
+        'context_history_db_path': bot_data.get('context_history_db_path', DEFAULT_CONFIG['Bot']['context_history_db_path']),
         'context_history_enabled': str(bot_data.get('context_history_enabled', DEFAULT_CONFIG['Bot']['context_history_enabled'])).lower() == 'true',
         'debug_logging_enabled': str(bot_data.get('debug_logging_enabled', DEFAULT_CONFIG['Bot']['debug_logging_enabled'])).lower() == 'true',
-        'ai_system_instructions': bot_data.get('ai_system_instructions', DEFAULT_CONFIG['Bot']['ai_system_instructions'])
+        'log_buffer_size': str(bot_data.get('log_buffer_size', DEFAULT_CONFIG['Bot']['log_buffer_size'])),
+        'ai_system_instructions': bot_data.get('ai_system_instructions', DEFAULT_CONFIG['Bot']['ai_system_instructions']),
+        'ai_worker_threads': str(bot_data.get('ai_worker_threads', DEFAULT_CONFIG['Bot']['ai_worker_threads'])),
+        'ai_user_rate_per_minute': str(bot_data.get('ai_user_rate_per_minute', DEFAULT_CONFIG['Bot']['ai_user_rate_per_minute'])),
+        'ai_user_burst': str(bot_data.get('ai_user_burst', DEFAULT_CONFIG['Bot']['ai_user_burst'])),
+        'ai_channel_rate_per_minute': str(bot_data.get('ai_channel_rate_per_minute', DEFAULT_CONFIG['Bot']['ai_channel_rate_per_minute'])),
+        'ai_channel_burst': str(bot_data.get('ai_channel_burst', DEFAULT_CONFIG['Bot']['ai_channel_burst'])),
+        'outbound_messages_per_second': str(bot_data.get('outbound_messages_per_second', DEFAULT_CONFIG['Bot']['outbound_messages_per_second'])),
+        'outbound_destination_interval_ms': str(bot_data.get('outbound_destination_interval_ms', DEFAULT_CONFIG['Bot']['outbound_destination_interval_ms'])),
+        'outbound_max_pending': str(bot_data.get('outbound_max_pending', DEFAULT_CONFIG['Bot']['outbound_max_pending'])),
+        'inbound_max_message_bytes': str(bot_data.get('inbound_max_message_bytes', DEFAULT_CONFIG['Bot']['inbound_max_message_bytes'])),
+        'inbound_fragment_timeout_seconds': str(bot_data.get('inbound_fragment_timeout_seconds', DEFAULT_CONFIG['Bot']['inbound_fragment_timeout_seconds'])),
+        'welcome_pool_size': str(bot_data.get('welcome_pool_size', DEFAULT_CONFIG['Bot']['welcome_pool_size'])),
+        'welcome_pool_low_watermark': str(bot_data.get('welcome_pool_low_watermark', DEFAULT_CONFIG['Bot']['welcome_pool_low_watermark']))
     }
     
     # config['WebUI'] = { # No longer saving secret_key to config.ini
     #     'secret_key': webui_data.get('secret_key', '')
     # }
+    return config
+
+def render_config(structured_config_data) -> str:
+    buffer = io.StringIO()
+    _build_config(structured_config_data).write(buffer)
+    return buffer.getvalue()
+
+_write_lock = threading.RLock() # Serialises every config.ini write; re-entered when save_config() flushes the writer
 
+def _read_config_text():
     try:
-        with open(CONFIG_FILE, 'w') as configfile:
-            config.write(configfile)
-        logging.info(f"Configuration saved to {CONFIG_FILE}")
-    except IOError as e:
-        logging.error(f"Error saving configuration to {CONFIG_FILE}: {e}")
+        with open(CONFIG_FILE, 'r') as existing: return existing.read()
+    except (IOError, OSError):
+        return None
+
+def _write_config_text(text: str) -> bool:
+    """Atomically replaces CONFIG_FILE with text: temp file, fsync, rename. Returns False if the file already holds text."""
+    with _write_lock:
+        # Compared with the file itself, so a hand edit since our last write is never mistaken for our own text
+        if text == _read_config_text(): return False
+
+        directory = os.path.dirname(os.path.abspath(CONFIG_FILE))
+        fd, tmp_path = tempfile.mkstemp(prefix='.config-', suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'w') as tmp:
+                tmp.write(text)
+                tmp.flush()
+                os.fsync(tmp.fileno())
+            if os.path.exists(CONFIG_FILE):
+                os.chmod(tmp_path, stat.S_IMODE(os.stat(CONFIG_FILE).st_mode))
+            os.replace(tmp_path, CONFIG_FILE)
+        except BaseException:
+            try: os.unlink(tmp_path)
+            except OSError: pass
+            raise
+        if hasattr(os, 'O_DIRECTORY'): # Make the rename itself durable
+            try:
+                dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+                try: os.fsync(dir_fd)
+                finally: os.close(dir_fd)
+            except OSError: pass
+        config_service.invalidate()
+        return True
+
+def _log_write(written: bool):
+    if written: logging.info(f"Configuration saved to {CONFIG_FILE}")
+    else: logging.debug(f"Configuration unchanged; skipped writing {CONFIG_FILE}")
+
+def save_config(structured_config_data):
+    """Writes a whole config. Use update_config() to change only some keys."""
+    with _write_lock:
+        # A bot-side change still waiting in the writer goes first, so it cannot land on top of this save later
+        config_writer.flush()
+        try:
+            _log_write(_write_config_text(render_config(structured_config_data)))
+        except (IOError, OSError) as e:
+            logging.error(f"Error saving configuration to {CONFIG_FILE}: {e}")
+
+def update_config(changes):
+    """Merges {section: {key: value}} onto config.ini as it is on disk now; other keys keep their current values."""
+    with _write_lock:
+        config_writer.flush()
+        current = configparser.ConfigParser(interpolation=None)
+        try:
+            current.read(CONFIG_FILE)
+        except configparser.Error as e:
+            logging.error(f"Error reading config file {CONFIG_FILE}: {e}. Not saving changes.")
+            return
+        merged = {section: dict(current.items(section)) for section in current.sections()}
+        for section, values in changes.items():
+            merged.setdefault(section, {}).update(values)
+        try:
+            _log_write(_write_config_text(render_config(merged)))
+        except (IOError, OSError) as e:
+            logging.error(f"Error saving configuration to {CONFIG_FILE}: {e}")
+
+class ConfigWriter:
+    """Coalesces runtime config changes and writes them on a background thread.
+
+    schedule() is cheap and safe to call from the event loop. Only the changed keys are kept, and
+    they are merged onto config.ini as it is at write time, so edits made meanwhile through the web
+    UI or by hand survive. Changes arriving within delay seconds of the first are written together.
+    """
+
+    def __init__(self, delay: float = 2.0):
+        self.delay = delay
+        self._pending = {} # section -> {key: value} changed since the last write
+        self._due = None
+        self._cond = threading.Condition()
+        self._thread = None # Started by the first schedule()
+        self.writes = self.coalesced = 0
+
+    def schedule(self, changes):
+        if not any(changes.values()): return
+        with self._cond:
+            if self._pending: self.coalesced += 1
+            else: self._due = time.monotonic() + self.delay
+            for section, values in changes.items():
+                self._pending.setdefault(section, {}).update(values)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="config-writer", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _write_pending(self):
+        with _write_lock:
+            with self._cond:
+                changes, self._pending, self._due = self._pending, {}, None
+            if changes:
+                update_config(changes) # Re-enters _write_lock; its own flush() finds nothing pending
+                self.writes += 1
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending or time.monotonic() < self._due:
+                    self._cond.wait(None if not self._pending else self._due - time.monotonic())
+            self._write_pending()
+
+    def flush(self):
+        """Writes any pending change now, on the calling thread."""
+        self._write_pending()
+
+config_writer = ConfigWriter()
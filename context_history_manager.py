@@ -1,54 +1,206 @@
-
 import collections
-import datetime
 import logging
 import threading
+import time
+
+LOCK_STRIPES = 16
+
+class HistoryEntry:
+    __slots__ = ('message', 'sender_nick', 'is_bot', 'timestamp', 'size')
+
+    def __init__(self, message: str, sender_nick: str, is_bot: bool, timestamp: float):
+        self.message = message
+        self.sender_nick = sender_nick
+        self.is_bot = is_bot
+        self.timestamp = timestamp # time.monotonic()
+        self.size = len(message.encode('utf-8', errors='replace'))
+
+    def __repr__(self):
+        return f"HistoryEntry({self.sender_nick!r}, {self.message!r}, is_bot={self.is_bot})"
 
 class ContextHistoryManager:
-    def __init__(self, retention_minutes: int = 60, max_messages: int = 20):
+    """Per-key conversation history.
+
+    Each key maps to an immutable tuple of HistoryEntry that is replaced on every change, so
+    get_history() can hand out the stored tuple itself and readers on other threads iterate it
+    without copying or locking. Writers are serialised per key through a small set of striped locks.
+
+    A background sweeper drops keys whose messages have all expired, and the number of live keys
+    is capped with least-recently-active eviction. With a ContextHistoryStore attached, messages
+    are also persisted and each key is loaded lazily from disk the first time it is used.
+    """
+
+    def __init__(self, retention_minutes: int = 60, max_messages: int = 20, max_keys: int = 5000, sweep_interval: float = 60.0, store=None):
         self.retention_minutes = retention_minutes
-        self.max_messages = max_messages
-        self.history = collections.defaultdict(lambda: collections.deque(maxlen=self.max_messages))
-        self._lock = threading.Lock()
-        logging.debug(f"ContextHistoryManager initialized with retention: {retention_minutes} minutes, max_messages: {max_messages}")
+        self.max_messages = max(1, int(max_messages))
+        self.max_keys = max(1, int(max_keys))
+        self.history = {} # key -> tuple[HistoryEntry, ...]
+        self._locks = tuple(threading.Lock() for _ in range(LOCK_STRIPES))
+        # key -> last write time, least recently active first; also guards the counters below
+        self._activity = collections.OrderedDict()
+        self._activity_lock = threading.Lock()
+        self._message_count = self._byte_count = 0
+        self.evicted_keys = self.swept_keys = 0
+        self.store = store
+        self._loaded = collections.OrderedDict() # keys already read from the store, bounded LRU
+        self._stop_event = threading.Event()
+        self._sweeper = None
+        if sweep_interval > 0:
+            self._sweeper = threading.Thread(target=self._sweep_loop, args=(sweep_interval,), name="context-history-sweeper", daemon=True)
+            self._sweeper.start()
+        logging.debug(f"ContextHistoryManager initialized with retention: {retention_minutes} minutes, max_messages: {max_messages}, max_keys: {self.max_keys}")
+
+    def _lock_for(self, user_id: str) -> threading.Lock:
+        return self._locks[hash(user_id) % LOCK_STRIPES]
+
+    def _cutoff(self, now: float = None) -> float:
+        return (time.monotonic() if now is None else now) - self.retention_minutes * 60
+
+    def _pruned(self, entries: tuple, cutoff: float) -> tuple:
+        # Entries are in arrival order, so expired ones are always a prefix
+        start = 0
+        while start < len(entries) and entries[start].timestamp < cutoff:
+            start += 1
+        return entries[start:] if start else entries
+
+    def _replace(self, user_id: str, entries: tuple):
+        # Caller holds the key's stripe lock; keeps the message/byte counters in step
+        old = self.history.get(user_id, ())
+        if entries: self.history[user_id] = entries
+        else: self.history.pop(user_id, None)
+        delta_messages = len(entries) - len(old)
+        delta_bytes = sum(e.size for e in entries) - sum(e.size for e in old)
+        with self._activity_lock:
+            self._message_count += delta_messages
+            self._byte_count += delta_bytes
+            if not entries: self._activity.pop(user_id, None)
+
+    def _ensure_loaded(self, user_id: str):
+        # Caller holds the key's stripe lock. Keys already in memory were loaded (or started) in this process.
+        if self.store is None or user_id in self.history or user_id in self._loaded: return
+        rows = self.store.load(user_id)
+        with self._activity_lock:
+            self._loaded[user_id] = True
+            while len(self._loaded) > self.max_keys:
+                self._loaded.popitem(last=False)
+        if not rows: return
+        # Stored times are wall-clock; entries use monotonic time
+        offset = time.monotonic() - time.time()
+        entries = tuple(HistoryEntry(message, sender_nick, bool(is_bot), created_at + offset) for created_at, sender_nick, message, is_bot in rows)
+        self._replace(user_id, entries)
+        with self._activity_lock:
+            # Activity stays in time order; the sweeper prunes by the entries' own timestamps
+            self._activity[user_id] = time.monotonic()
+            self._activity.move_to_end(user_id)
+        logging.debug(f"Loaded {len(entries)} stored messages for user_id {user_id}.")
 
     def add_message(self, user_id: str, message: str, sender_nick: str, is_bot: bool = False):
-        with self._lock:
-            timestamp = datetime.datetime.now()
-            self.history[user_id].append({'message': message, 'timestamp': timestamp, 'sender_nick': sender_nick, 'is_bot': is_bot})
-            self._prune_history(user_id)
-            logging.debug(f"Added message from '{sender_nick}' for user_id {user_id}. Current history length: {len(self.history[user_id])}")
-
-    def get_history(self, user_id: str) -> list[dict]:
-        with self._lock:
-            self._prune_history(user_id)
-            current_history = list(self.history[user_id])
-            logging.debug(f"Retrieved history for user_id {user_id}. Length: {len(current_history)}")
-            return current_history
+        now = time.monotonic()
+        entry = HistoryEntry(message, sender_nick, is_bot, now)
+        with self._lock_for(user_id):
+            self._ensure_loaded(user_id)
+            if self.store is not None: self.store.append(user_id, time.time(), sender_nick, message, is_bot)
+            entries = self._pruned(self.history.get(user_id, ()), self._cutoff(now)) + (entry,)
+            if len(entries) > self.max_messages:
+                entries = entries[-self.max_messages:]
+            self._replace(user_id, entries)
+        victims = []
+        with self._activity_lock:
+            self._activity[user_id] = now
+            self._activity.move_to_end(user_id)
+            while len(self._activity) > self.max_keys:
+                victims.append(self._activity.popitem(last=False)[0])
+        for victim in victims:
+            self._drop_key(victim)
+            # Evicted keys can be reloaded from the store if they come back
+            with self._activity_lock: self._loaded.pop(victim, None)
+        self.evicted_keys += len(victims)
+        logging.debug(f"Added message from '{sender_nick}' for user_id {user_id}. Current history length: {len(entries)}")
+
+    def _drop_key(self, user_id: str):
+        with self._lock_for(user_id):
+            self._replace(user_id, ())
+
+    def _expire(self, user_id: str) -> tuple:
+        if self.store is not None and user_id not in self.history and user_id not in self._loaded:
+            with self._lock_for(user_id):
+                self._ensure_loaded(user_id)
+        entries = self.history.get(user_id)
+        if not entries: return ()
+        pruned = self._pruned(entries, self._cutoff())
+        if pruned is not entries:
+            with self._lock_for(user_id):
+                # Re-prune under the lock in case a writer replaced the tuple meanwhile
+                pruned = self._pruned(self.history.get(user_id, ()), self._cutoff())
+                self._replace(user_id, pruned)
+        return pruned
+
+    def get_history(self, user_id: str) -> tuple:
+        """Returns the key's history as an immutable tuple of HistoryEntry, oldest first."""
+        history = self._expire(user_id)
+        logging.debug(f"Retrieved history for user_id {user_id}. Length: {len(history)}")
+        return history
 
     def set_retention_minutes(self, minutes: int):
         if minutes < 0:
             raise ValueError("Retention minutes cannot be negative.")
         logging.debug(f"Setting retention minutes to: {minutes}")
-        with self._lock:
-            self.retention_minutes = minutes
-            for user_id in self.history:
-                self._prune_history(user_id)
-
-    def _prune_history(self, user_id: str):
-        min_timestamp = datetime.datetime.now() - datetime.timedelta(minutes=self.retention_minutes)
-        initial_len = len(self.history[user_id])
-        while self.history[user_id] and self.history[user_id][0]['timestamp'] < min_timestamp:
-            self.history[user_id].popleft()
-        if len(self.history[user_id]) < initial_len:
-            logging.debug(f"Pruned history for user_id {user_id}. Removed {initial_len - len(self.history[user_id])} messages.")
+        self.retention_minutes = minutes
+        if self.store is not None: self.store.set_retention_minutes(minutes)
+        for user_id in list(self.history):
+            self._expire(user_id)
+
+    def set_max_messages(self, max_messages: int):
+        self.max_messages = max(1, int(max_messages))
+        # The store trims its rows to the same limit, so stored and in-memory history stay in step
+        if self.store is not None: self.store.max_messages = self.max_messages
 
     def clear_history(self, user_id: str = None):
-        with self._lock:
-            if user_id:
-                if user_id in self.history:
-                    del self.history[user_id]
-                    logging.debug(f"Cleared history for user_id: {user_id}")
-            else:
-                self.history.clear()
-                logging.debug("Cleared all history.")
+        if self.store is not None: self.store.clear(user_id)
+        if user_id:
+            if user_id in self.history:
+                self._drop_key(user_id)
+                logging.debug(f"Cleared history for user_id: {user_id}")
+        else:
+            for key in list(self.history):
+                self._drop_key(key)
+            logging.debug("Cleared all history.")
+
+    def sweep(self) -> int:
+        """Drops idle keys and expired messages. Returns the number of keys removed."""
+        cutoff = self._cutoff()
+        idle = []
+        with self._activity_lock:
+            # Least recently active first, so only keys whose last write has expired are visited
+            for key, last_active in self._activity.items():
+                if last_active >= cutoff: break
+                idle.append(key)
+        # Expiring rather than dropping outright keeps a message that raced in after the snapshot
+        removed = sum(1 for key in idle if not self._expire(key))
+        self.swept_keys += removed
+        if removed: logging.debug(f"Context history sweep removed {removed} idle keys.")
+        return removed
+
+    def _sweep_loop(self, interval: float):
+        while not self._stop_event.wait(interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                logging.error(f"Context history sweep failed: {e}", exc_info=True)
+
+    def get_stats(self) -> dict:
+        with self._activity_lock:
+            return {
+                "keys": len(self.history),
+                "messages": self._message_count,
+                "bytes": self._byte_count,
+                "max_keys": self.max_keys,
+                "evicted_keys": self.evicted_keys,
+                "swept_keys": self.swept_keys,
+            }
+
+    def close(self):
+        self._stop_event.set()
+        if self._sweeper and self._sweeper is not threading.current_thread():
+            self._sweeper.join(timeout=1.0)
+        if self.store is not None: self.store.close()
@@ -0,0 +1,183 @@
+import collections
+import logging
+import queue
+import sqlite3
+import threading
+import time
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    context_key TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    sender_nick TEXT NOT NULL,
+    message TEXT NOT NULL,
+    is_bot INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_messages_key ON messages (context_key, id);
+CREATE INDEX IF NOT EXISTS idx_messages_created ON messages (created_at);
+"""
+
+class ContextHistoryStore:
+    """SQLite (WAL) backing store for ContextHistoryManager.
+
+    Writes are queued and committed in batches by a background thread; reads happen per key,
+    on first access, so startup never replays the whole store. A read merges the committed rows
+    with that key's still-queued writes instead of waiting for the writer. Retention and the
+    per-key message limit are enforced in the database as well.
+    """
+
+    def __init__(self, path: str, retention_minutes: int = 60, max_messages: int = 20, prune_interval: float = 60.0):
+        self.path = path
+        self.retention_minutes = retention_minutes
+        self.max_messages = max_messages
+        self.prune_interval = prune_interval
+        self._queue = queue.Queue()
+        # Queued but uncommitted writes, so reads see them: key -> deque of (seq, row or None for a clear)
+        self._pending = {}
+        self._pending_clear_all = collections.deque() # seqs of queued clear() calls for every key
+        self._seq = 0
+        self._lock = threading.Lock() # Guards the above; held across COMMIT and the read, so a write is never seen twice or missed
+        self._write_conn = self._connect()
+        self._write_conn.executescript(_SCHEMA)
+        self._read_conn = self._connect()
+        self._closed = False
+        self._writer = threading.Thread(target=self._writer_loop, name="context-history-writer", daemon=True)
+        self._writer.start()
+        logging.info(f"Context history store opened at {path}.")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def append(self, context_key: str, created_at: float, sender_nick: str, message: str, is_bot: bool):
+        if self._closed: return
+        row = (created_at, sender_nick, message, int(is_bot))
+        with self._lock:
+            self._seq += 1
+            self._pending.setdefault(context_key, collections.deque()).append((self._seq, row))
+            self._queue.put(('add', self._seq, context_key) + row)
+
+    def clear(self, context_key: str = None):
+        if self._closed: return
+        with self._lock:
+            self._seq += 1
+            if context_key is None: self._pending_clear_all.append(self._seq)
+            else: self._pending.setdefault(context_key, collections.deque()).append((self._seq, None))
+            self._queue.put(('clear', self._seq, context_key))
+
+    def set_retention_minutes(self, minutes: int):
+        self.retention_minutes = minutes
+        if not self._closed:
+            self._queue.put(('prune',))
+
+    def load(self, context_key: str) -> list[tuple]:
+        """Returns (created_at, sender_nick, message, is_bot) rows for the key, oldest first."""
+        cutoff = time.time() - self.retention_minutes * 60
+        with self._lock:
+            rows = self._read_conn.execute(
+                "SELECT created_at, sender_nick, message, is_bot FROM messages "
+                "WHERE context_key = ? AND created_at >= ? ORDER BY id DESC LIMIT ?",
+                (context_key, cutoff, self.max_messages)).fetchall()
+            pending = list(self._pending.get(context_key, ()))
+            clear_all = self._pending_clear_all[-1] if self._pending_clear_all else None
+        rows.reverse()
+        # Replay the key's queued writes on top; every committed row predates them
+        if clear_all is not None:
+            rows = []
+            pending = [op for op in pending if op[0] > clear_all]
+        for _, row in pending:
+            if row is None: rows = []
+            elif row[0] >= cutoff: rows.append(row)
+        return rows[-self.max_messages:]
+
+    def flush(self, timeout: float = 5.0):
+        if self._closed: return
+        done = threading.Event()
+        self._queue.put(('flush', done))
+        done.wait(timeout)
+
+    def _writer_loop(self):
+        next_prune = time.monotonic() + self.prune_interval
+        while True:
+            try:
+                batch = [self._queue.get(timeout=self.prune_interval)]
+            except queue.Empty:
+                batch = []
+            while len(batch) < 500:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(op[0] == 'stop' for op in batch)
+            prune = stop or time.monotonic() >= next_prune
+            if prune: next_prune = time.monotonic() + self.prune_interval
+            try:
+                self._write_batch(batch, prune)
+            except sqlite3.Error as e:
+                logging.error(f"Failed to write context history batch: {e}", exc_info=True)
+            finally:
+                for op in batch:
+                    if op[0] == 'flush': op[1].set()
+                    self._queue.task_done()
+            if stop: return
+
+    def _write_batch(self, batch, prune: bool):
+        if not prune and not any(op[0] in ('add', 'clear', 'prune') for op in batch): return
+        touched = set()
+        conn = self._write_conn
+        conn.execute("BEGIN")
+        try:
+            for op in batch:
+                kind = op[0]
+                if kind == 'add':
+                    conn.execute("INSERT INTO messages (context_key, created_at, sender_nick, message, is_bot) VALUES (?, ?, ?, ?, ?)", op[2:])
+                    touched.add(op[2])
+                elif kind == 'clear':
+                    if op[2] is None: conn.execute("DELETE FROM messages")
+                    else: conn.execute("DELETE FROM messages WHERE context_key = ?", (op[2],))
+                elif kind == 'prune':
+                    prune = True
+            for key in touched:
+                # Keep only the newest max_messages rows for each key written in this batch
+                conn.execute(
+                    "DELETE FROM messages WHERE context_key = ? AND id NOT IN "
+                    "(SELECT id FROM messages WHERE context_key = ? ORDER BY id DESC LIMIT ?)",
+                    (key, key, self.max_messages))
+            if prune:
+                conn.execute("DELETE FROM messages WHERE created_at < ?", (time.time() - self.retention_minutes * 60,))
+            with self._lock:
+                conn.execute("COMMIT")
+                self._forget_pending(batch)
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            with self._lock: self._forget_pending(batch) # The batch is lost either way
+            raise
+
+    def _forget_pending(self, batch):
+        # Caller holds the lock. Ops are committed in queue order, so each key's oldest entries go first.
+        for op in batch:
+            if op[0] not in ('add', 'clear'): continue
+            seq, key = op[1], op[2]
+            if key is None:
+                while self._pending_clear_all and self._pending_clear_all[0] <= seq:
+                    self._pending_clear_all.popleft()
+                continue
+            ops = self._pending.get(key)
+            while ops and ops[0][0] <= seq:
+                ops.popleft()
+            if not ops: self._pending.pop(key, None)
+
+    def close(self):
+        if self._closed: return
+        self._queue.put(('stop',))
+        self._closed = True
+        self._writer.join(timeout=5.0)
+        for conn in (self._write_conn, self._read_conn):
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        logging.info("Context history store closed.")
@@ -0,0 +1,70 @@
+import logging
+import queue
+import threading
+
+class Subscription:
+    """One listener's queue of (topic, data) events. Slow listeners lose their oldest events."""
+
+    def __init__(self, max_queue: int = 256):
+        self._queue = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+
+    def put(self, event):
+        while True:
+            try:
+                self._queue.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout: float = None):
+        """Next (topic, data), or None if nothing arrived within timeout."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+class EventBus:
+    """In-process publish/subscribe used to push bot state and log lines to the web UI.
+
+    publish() never blocks and costs a single check when nobody is listening. Retained topics
+    (like the bot status) remember their last value, which new subscribers receive first, and
+    republishing an unchanged value is a no-op.
+    """
+
+    def __init__(self):
+        self._subscribers = set()
+        self._retained = {}
+        self._lock = threading.Lock()
+
+    @property
+    def has_subscribers(self) -> bool:
+        return bool(self._subscribers)
+
+    def subscribe(self, max_queue: int = 256) -> Subscription:
+        subscription = Subscription(max_queue)
+        with self._lock:
+            for topic, data in self._retained.items():
+                subscription.put((topic, data))
+            self._subscribers.add(subscription)
+        logging.debug(f"Event bus subscriber added ({len(self._subscribers)} total).")
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, topic: str, data, retain: bool = False):
+        with self._lock:
+            if retain:
+                if self._retained.get(topic) == data: return
+                self._retained[topic] = data
+            if not self._subscribers: return
+            for subscription in self._subscribers:
+                subscription.put((topic, data))
+
+event_bus = EventBus()
@@ -2,7 +2,7 @@
 import logging
 from TeamTalk5 import TextMsgType
 
-def handle_instruct_command(bot, msg_from_id, args_str, channel_id=None, **kwargs):
+def handle_instruct_command(bot, msg_from_id, args_str, channel_id=None, sender_nick=None, **kwargs):
     if not bot._is_admin(msg_from_id):
         bot._send_pm(msg_from_id, "You are not authorized to use this command.")
         return
@@ -25,4 +25,4 @@ def handle_instruct_command(bot, msg_from_id, args_str, channel_id=None, **kwarg
         bot._send_pm(msg_from_id, response)
     elif message_type == TextMsgType.MSGTYPE_CHANNEL:
         bot._send_channel_message(channel_id, response)
-    logging.info(f"Admin {bot.getUser(msg_from_id).szNickname} updated AI system instructions.")
+    logging.info(f"Admin {sender_nick or msg_from_id} updated AI system instructions.")
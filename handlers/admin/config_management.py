@@ -56,7 +56,7 @@ def handle_set_context_retention(bot, msg_from_id, args_str, **kwargs):
             raise ValueError("Retention minutes cannot be negative.")
         
         bot.context_history_manager.set_retention_minutes(retention_minutes)
-        bot.config['Bot']['context_history_retention_minutes'] = str(retention_minutes)
+        bot.config['Bot']['context_history_retention_minutes'] = retention_minutes
         bot._save_runtime_config()
         bot._send_pm(msg_from_id, f"Context history retention set to {retention_minutes} minutes.")
     except ValueError:
@@ -70,6 +70,7 @@ def handle_add_word(bot, msg_from_id, args_str, **kwargs):
     if not word:
         bot._send_pm(msg_from_id, "Usage: addword <word>"); return
     bot.filtered_words.add(word)
+    bot._rebuild_word_filter()
     bot.filter_enabled = True
     bot._save_runtime_config()
     bot._send_pm(msg_from_id, f"Word '{word}' added to filter. Filter enabled.")
@@ -79,11 +80,77 @@ def handle_del_word(bot, msg_from_id, args_str, **kwargs):
     if not word:
         bot._send_pm(msg_from_id, "Usage: delword <word>"); return
     bot.filtered_words.discard(word)
+    bot._rebuild_word_filter()
     if not bot.filtered_words:
         bot.filter_enabled = False
     bot._save_runtime_config()
     bot._send_pm(msg_from_id, f"Word '{word}' removed from filter.")
 
+def _format_cache_stats(name, stats):
+    return (f"- {name}: {stats['entries']} entries, {stats['hits']} hits, {stats['misses']} misses "
+            f"({stats['hit_rate'] * 100:.1f}% hit rate), {stats['coalesced']} coalesced, {stats['evictions']} evicted")
+
+def handle_cache_stats(bot, msg_from_id, **kwargs):
+    lines = ["--- Cache Stats ---"]
+    lines.append(_format_cache_stats("Weather", bot.weather_service.get_cache_stats()))
+    lines.append(_format_cache_stats("Hariku", bot.hariku_service.get_cache_stats()))
+    gemini_stats = bot.gemini_service.get_cache_stats()
+    if gemini_stats:
+        lines.append(_format_cache_stats("Gemini", gemini_stats) + f", {gemini_stats['bytes']} bytes")
+    else:
+        lines.append("- Gemini: disabled (set gemini_cache_enabled = True to enable)")
+    bot._send_pm(msg_from_id, "\n".join(lines))
+
+def handle_set_ai_rate_limit(bot, msg_from_id, args_str, **kwargs):
+    usage = "Usage: set_ai_rate_limit <user|channel> <requests_per_minute> [burst] (0 = unlimited)"
+    parts = args_str.split()
+    if len(parts) not in (2, 3) or parts[0] not in ("user", "channel"):
+        bot._send_pm(msg_from_id, usage); return
+    try:
+        rate = float(parts[1])
+        burst = int(parts[2]) if len(parts) == 3 else None
+        if rate < 0 or (burst is not None and burst < 1): raise ValueError
+    except ValueError:
+        bot._send_pm(msg_from_id, usage); return
+    limiter = bot.ai_user_limiter if parts[0] == "user" else bot.ai_channel_limiter
+    limiter.configure(rate, burst)
+    bot.config['Bot'][f'ai_{parts[0]}_rate_per_minute'] = rate
+    bot.config['Bot'][f'ai_{parts[0]}_burst'] = limiter.burst
+    bot._save_runtime_config()
+    bot._send_pm(msg_from_id, f"AI {parts[0]} rate limit set to {rate:g}/min (burst {limiter.burst})." if rate else f"AI {parts[0]} rate limit disabled.")
+
+def handle_ai_queue_stats(bot, msg_from_id, **kwargs):
+    stats = bot.ai_executor.get_stats()
+    lines = [
+        "--- AI Queue ---",
+        f"Workers: {stats['workers']}, queued: {stats['queued']} jobs from {stats['queued_owners']} senders, completed: {stats['completed']}",
+        f"Queue wait: avg {stats['avg_wait']:.2f}s, max {stats['max_wait']:.2f}s, last {stats['last_wait']:.2f}s",
+    ]
+    for name, limiter in (("User", bot.ai_user_limiter), ("Channel", bot.ai_channel_limiter)):
+        limit = f"{limiter.rate_per_minute:g}/min, burst {limiter.burst}" if limiter.enabled else "unlimited"
+        lines.append(f"{name} limit: {limit}, {limiter.rejected} requests rejected")
+    bot._send_pm(msg_from_id, "\n".join(lines))
+
+def handle_outbound_stats(bot, msg_from_id, **kwargs):
+    stats = bot.outbound.get_stats()
+    high, normal, low = stats['pending_by_priority']
+    lines = [
+        "--- Outbound Queue ---",
+        f"Pending: {stats['pending']}/{stats['max_pending']} (high {high}, normal {normal}, low {low}) to {stats['destinations']} destinations",
+        f"Oldest pending: {stats['oldest_wait']:.1f}s",
+        f"Sent: {stats['sent']}, coalesced: {stats['coalesced']}, dropped: {stats['dropped']}, failed: {stats['failed']}",
+    ]
+    inbound = bot.inbound.get_stats()
+    lines.append(f"Incoming partial messages: {inbound['partials']}, dropped: {inbound['dropped_oversize']} oversized, "
+                 f"{inbound['dropped_timeout']} timed out, {inbound['dropped_overflow']} over limit")
+    bot._send_pm(msg_from_id, "\n".join(lines))
+
+def handle_flush_gemini_cache(bot, msg_from_id, **kwargs):
+    if bot.gemini_service.get_cache_stats() is None:
+        bot._send_pm(msg_from_id, "Gemini response cache is disabled."); return
+    count = bot.gemini_service.flush_response_cache()
+    bot._send_pm(msg_from_id, f"Flushed {count} cached Gemini responses.")
+
 def handle_set_ai_system_instructions(bot, msg_from_id, args_str, **kwargs):
     if not args_str:
         bot._send_pm(msg_from_id, "Usage: set_ai_system_instructions <instructions>"); return
@@ -107,19 +174,22 @@ def handle_set_hariku_api_key(bot, msg_from_id, args_str, **kwargs):
         bot._send_pm(msg_from_id, "Usage: harikuapi <your_hariku_api_key>"); return
 
     new_api_key = args_str.strip()
-    original_api_key = bot.hariku_service.api_key # Store original key
-
-    # Temporarily set and try to validate with the new key
-    if bot.hariku_service.validate_api_key(new_api_key):
-        bot.hariku_service.api_key = new_api_key
-        bot.hariku_service._enabled = True # Enable service if key is valid
-        feedback = "Hariku API key updated and validated successfully."
-        bot._save_runtime_config(save_hariku_key=True)
-    else:
-        # If validation failed, revert to original key and disable Hariku features
-        bot.hariku_service.api_key = original_api_key # Revert API key
-        bot.hariku_service._enabled = False # Disable service
-        feedback = "Hariku API key provided is invalid. Key not saved."
-    
-    bot._send_pm(msg_from_id, feedback)
-    if bot.main_window: bot.main_window.update_feature_list()
+
+    def apply_result(valid):
+        # Back on the event loop
+        if valid is True:
+            bot.hariku_service.api_key = new_api_key
+            bot.hariku_service._enabled = True # Enable service if key is valid
+            feedback = "Hariku API key updated and validated successfully."
+            bot._save_runtime_config(save_hariku_key=True)
+        else:
+            # Validation failed: keep the original key and disable Hariku features
+            bot.hariku_service._enabled = False # Disable service
+            feedback = "Hariku API key provided is invalid. Key not saved."
+        bot._send_pm(msg_from_id, feedback)
+        if bot.main_window: bot.main_window.update_feature_list()
+
+    # The check is a network round trip, so it runs on a worker instead of the event loop
+    bot._send_pm(msg_from_id, "Validating Hariku API key...")
+    bot.submit_ai_job(lambda: bot.hariku_service.validate_api_key(new_api_key), apply_result,
+                      on_error=lambda error: apply_result(False), owner=msg_from_id)
@@ -30,6 +30,7 @@ def handle_toggle_welcome_mode(bot, msg_from_id, **kwargs):
             bot._send_pm(msg_from_id, "Error: Cannot switch to Gemini mode, AI not available.")
             return
         bot.welcome_message_mode = "gemini"
+        bot.welcome_pool.ensure_filled()
         feedback = "Welcome message mode set to: Gemini."
     else:
         bot.welcome_message_mode = "template"
@@ -6,9 +6,9 @@ def handle_list_users(bot, msg_from_id, args_str, **kwargs):
     chan_id = bot.getChannelIDFromPath(ttstr(path_str)) if path_str else bot._target_channel_id
     if chan_id <= 0: bot._send_pm(msg_from_id, f"Error: Channel not found."); return
 
-    users = sorted(list(bot.getChannelUsers(chan_id) or []), key=lambda u: ttstr(u.szNickname).lower())
+    users = sorted(bot.roster.in_channel(chan_id), key=lambda u: u.nickname.lower())
     user_list = [f"Users in '{path_str}':"]
-    user_list.extend(f"- {ttstr(u.szNickname)} (ID:{u.nUserID}, User:{ttstr(u.szUsername)})" for u in users)
+    user_list.extend(f"- {u.nickname} (ID:{u.user_id}, User:{u.username})" for u in users)
     bot._send_pm(msg_from_id, "\n".join(user_list) if users else f"No users found in '{path_str}'.")
 
 def handle_list_channels(bot, msg_from_id, **kwargs):
@@ -28,7 +28,7 @@ def handle_move_user(bot, msg_from_id, args_str, **kwargs):
     chan_id = bot.getChannelIDFromPath(ttstr(chan_path))
     if chan_id <= 0: bot._send_pm(msg_from_id, f"Error: Channel '{chan_path}' not found."); return
 
-    bot.doMoveUser(user.nUserID, chan_id)
+    bot.doMoveUser(user.user_id, chan_id)
     bot._send_pm(msg_from_id, f"Move command sent for '{nick}'.")
 
 def handle_kick_user(bot, msg_from_id, args_str, **kwargs):
@@ -36,10 +36,10 @@ def handle_kick_user(bot, msg_from_id, args_str, **kwargs):
     if not bot._in_channel: bot._send_pm(msg_from_id, "Error: Bot not in a channel to kick from."); return
     
     nick = args_str.strip()
-    user = next((u for u in bot.getChannelUsers(bot._target_channel_id) or [] if ttstr(u.szNickname).lower() == nick.lower()), None)
+    user = bot.roster.find_by_nick(nick, channel_id=bot._target_channel_id)
     if not user: bot._send_pm(msg_from_id, f"Error: User '{nick}' not in my channel."); return
 
-    bot.doKickUser(user.nUserID, bot._target_channel_id)
+    bot.doKickUser(user.user_id, bot._target_channel_id)
     bot._send_pm(msg_from_id, f"Kick command sent for '{nick}'.")
 
 def handle_ban_user(bot, msg_from_id, args_str, **kwargs):
@@ -49,8 +49,8 @@ def handle_ban_user(bot, msg_from_id, args_str, **kwargs):
     user = bot._find_user_by_nick(nick)
     if not user: bot._send_pm(msg_from_id, f"Error: User '{nick}' not found."); return
 
-    bot.doBanUserEx(user.nUserID, BanType.BANTYPE_USERNAME)
-    bot._send_pm(msg_from_id, f"Ban command sent for user '{ttstr(user.szUsername)}'.")
+    bot.doBanUserEx(user.user_id, BanType.BANTYPE_USERNAME)
+    bot._send_pm(msg_from_id, f"Ban command sent for user '{user.username}'.")
 
 def handle_unban_user(bot, msg_from_id, args_str, **kwargs):
     if not (bot.my_rights & UserRight.USERRIGHT_BAN_USERS): bot._send_pm(msg_from_id, "Error: Bot cannot unban users."); return
@@ -64,23 +64,19 @@ def handle_unban_user(bot, msg_from_id, args_str, **kwargs):
 
 def handle_list_admins(bot, msg_from_id, **kwargs):
     configured_admins = set(bot.admin_usernames_config)
-    online_users = bot.getServerUsers() or []
-    online_usernames = {ttstr(u.szUsername).lower() for u in online_users}
-    online_nicknames = {ttstr(u.szNickname).lower(): ttstr(u.szUsername).lower() for u in online_users}
 
     admin_status_messages = ["--- Admin Status ---"]
 
-    # Check configured admins
+    # Check configured admins against the roster's username index
     for admin_username in sorted(list(configured_admins)):
-        status = "Offline"
-        if admin_username in online_usernames:
-            status = "Online"
+        status = "Online" if bot.roster.is_username_online(admin_username) else "Offline"
         admin_status_messages.append(f"- {admin_username} (Configured): {status}")
     
     # Check if any online user is an admin by nickname but not by username (less reliable)
-    for online_nick, online_user in online_nicknames.items():
-        if online_user not in configured_admins and online_nick in configured_admins:
-             admin_status_messages.append(f"- {online_nick} (Online by Nick, not Configured by User): Online")
+    for admin_name in sorted(list(configured_admins)):
+        user = bot.roster.find_by_nick(admin_name)
+        if user and user.username.lower() not in configured_admins:
+             admin_status_messages.append(f"- {admin_name} (Online by Nick, not Configured by User): Online")
 
     if not configured_admins:
         admin_status_messages.append("No admin usernames configured in bot settings.")
@@ -1,5 +1,18 @@
 
 import logging
+from outbound_queue import PRIORITY_LOW
+
+AI_ERROR_REPLY = "[Bot Error] Error contacting Gemini."
+
+def _submit_streaming_reply(bot, prompt, history, context_key, send_chunk, on_complete, on_error, owner):
+    # Chunks are produced on the AI worker thread and sent from the event loop as they arrive
+    def job():
+        return bot.gemini_service.generate_content_stream(
+            prompt, lambda text: bot.task_scheduler.call_soon(send_chunk, text), history=history, context_key=context_key)
+    bot.submit_ai_job(job, on_complete, on_error=on_error, owner=owner)
+
+def _rate_limited_message(wait):
+    return f"[Bot] Too many AI requests. Please try again in {max(1, round(wait))} seconds."
 
 def handle_pm_ai(bot, msg_from_id, args_str, **kwargs):
     logging.debug(f"handle_pm_ai called for user_id: {msg_from_id}, prompt: '{args_str}'")
@@ -15,12 +28,30 @@ def handle_pm_ai(bot, msg_from_id, args_str, **kwargs):
         logging.debug(f"Empty prompt from user_id: {msg_from_id}")
         bot._send_pm(msg_from_id, "Usage: c <your question>"); return
 
+    wait = bot.check_ai_rate_limit(msg_from_id)
+    if wait:
+        bot._send_pm(msg_from_id, _rate_limited_message(wait)); return
+
     bot._send_pm(msg_from_id, "[Bot] Asking Gemini...")
     history = bot.context_history_manager.get_history(str(msg_from_id))
     logging.debug(f"Retrieved history for user_id {msg_from_id}: {history}")
-    reply = bot.gemini_service.generate_content(prompt, history=history)
-    logging.debug(f"Gemini reply for user_id {msg_from_id}: {reply}")
-    bot._send_pm(msg_from_id, reply)
+
+    def deliver_reply(reply):
+        logging.debug(f"Gemini reply for user_id {msg_from_id}: {reply}")
+        bot._send_pm(msg_from_id, reply, priority=PRIORITY_LOW)
+
+    def report_error(error):
+        bot._send_pm(msg_from_id, AI_ERROR_REPLY, record_history=False, priority=PRIORITY_LOW)
+
+    if bot.gemini_streaming_enabled:
+        def record_reply(reply):
+            # Chunks skip history; the whole reply is recorded once it is complete
+            if reply: bot.context_history_manager.add_message(str(msg_from_id), reply, bot.nickname, is_bot=True)
+        _submit_streaming_reply(bot, prompt, history, str(msg_from_id), lambda text: bot._send_pm(msg_from_id, text, record_history=False, priority=PRIORITY_LOW), record_reply, report_error, owner=msg_from_id)
+        return
+
+    # Runs on an AI worker thread; the reply is sent from the event loop
+    bot.submit_ai_job(lambda: bot.gemini_service.generate_content(prompt, history=history, context_key=str(msg_from_id)), deliver_reply, on_error=report_error, owner=msg_from_id)
 
 def handle_channel_ai(bot, msg_from_id, sender_nick, channel_id, args_str, **kwargs):
     if not bot.allow_gemini_channel:
@@ -32,6 +63,10 @@ def handle_channel_ai(bot, msg_from_id, sender_nick, channel_id, args_str, **kwa
     if not prompt:
         bot._send_channel_message(channel_id, "Usage: /c <your question>"); return
 
+    wait = bot.check_ai_rate_limit(msg_from_id, channel_id)
+    if wait:
+        bot._send_channel_message(channel_id, f"{sender_nick}: " + _rate_limited_message(wait)); return
+
     # Create a unique context key for the user in this channel
     user_channel_context_key = f"{channel_id}-{msg_from_id}"
 
@@ -41,8 +76,25 @@ def handle_channel_ai(bot, msg_from_id, sender_nick, channel_id, args_str, **kwa
     bot._send_channel_message(channel_id, f"[Bot] Asking Gemini for {sender_nick}...")
     history = bot.context_history_manager.get_history(user_channel_context_key)
     logging.debug(f"Retrieved history for user_channel_context_key {user_channel_context_key}: {history}")
-    reply = bot.gemini_service.generate_content(prompt, history=history)
-    logging.debug(f"Gemini reply for user_channel_context_key {user_channel_context_key}: {reply}")
-    # Add bot's reply to user's specific channel context history
-    bot.context_history_manager.add_message(user_channel_context_key, reply, bot.nickname, is_bot=True)
-    bot._send_channel_message(channel_id, f"Answering {sender_nick}: {reply}")
+
+    def deliver_reply(reply):
+        logging.debug(f"Gemini reply for user_channel_context_key {user_channel_context_key}: {reply}")
+        # Add bot's reply to user's specific channel context history
+        bot.context_history_manager.add_message(user_channel_context_key, reply, bot.nickname, is_bot=True)
+        bot._send_channel_message(channel_id, f"Answering {sender_nick}: {reply}", priority=PRIORITY_LOW)
+
+    def report_error(error):
+        bot._send_channel_message(channel_id, f"{sender_nick}: {AI_ERROR_REPLY}", record_history=False, priority=PRIORITY_LOW)
+
+    if bot.gemini_streaming_enabled:
+        first_chunk = [True]
+        def send_chunk(text):
+            prefix = f"Answering {sender_nick}: " if first_chunk[0] else ""
+            first_chunk[0] = False
+            bot._send_channel_message(channel_id, prefix + text, record_history=False, priority=PRIORITY_LOW)
+        def record_reply(reply):
+            if reply: bot.context_history_manager.add_message(user_channel_context_key, reply, bot.nickname, is_bot=True)
+        _submit_streaming_reply(bot, prompt, history, user_channel_context_key, send_chunk, record_reply, report_error, owner=msg_from_id)
+        return
+
+    bot.submit_ai_job(lambda: bot.gemini_service.generate_content(prompt, history=history, context_key=user_channel_context_key), deliver_reply, on_error=report_error, owner=msg_from_id)
@@ -1,6 +1,6 @@
 import logging
-import re
-from TeamTalk5 import TextMsgType, ttstr, UserRight
+from TeamTalk5 import TextMsgType, UserRight
+from outbound_queue import PRIORITY_HIGH, PRIORITY_NORMAL
 
 from . import user_commands, ai_commands, poll_commands, communication_commands
 from .admin import bot_control, config_management, feature_toggles, user_management, channel_management, ai_instructions
@@ -20,17 +20,14 @@ COMMAND_MAP_CHANNEL = {
     "instruct": ai_instructions.handle_instruct_command,
 }
 
-def handle_message(bot, textmessage, full_message_text):
+def handle_message(bot, textmessage, full_message_text, sender_nick=None):
     msg_from_id = textmessage.nFromUserID
     msg_type = textmessage.nMsgType
     msg_channel_id = textmessage.nChannelID
     
-    sender_nick = f"UserID_{msg_from_id}"
-    try:
-        sender_user = bot.getUser(msg_from_id)
-        if sender_user and sender_user.nUserID == msg_from_id:
-            sender_nick = ttstr(sender_user.szNickname)
-    except Exception: pass
+    if sender_nick is None:
+        sender = bot.get_user_snapshot(msg_from_id)
+        sender_nick = sender.nickname if sender else f"UserID_{msg_from_id}"
 
     log_and_process(bot, msg_type, msg_from_id, msg_channel_id, sender_nick, full_message_text)
 
@@ -76,32 +73,33 @@ def log_and_process(bot, msg_type, msg_from_id, msg_channel_id, sender_nick, ful
     if handler_func:
         if command_word in ADMIN_COMMANDS and not bot._is_admin(msg_from_id):
             bot._send_pm(msg_from_id, f"Error: You are not authorized to use '{command_word}'.")
-            logging.warning(f"Unauthorized admin command '{command_word}' by {sender_nick}.")
+            bot.logger.warning(f"Unauthorized admin command '{command_word}' by {sender_nick}.", extra={'user_id': msg_from_id, 'command': command_word})
             return
         
         try:
-            handler_func(bot=bot, msg_from_id=msg_from_id, args_str=args_str, channel_id=msg_channel_id, sender_nick=sender_nick, command=command_word, msg_type=msg_type)
+            # Admin replies jump ahead of queued command replies and AI chatter
+            with bot.outbound.using_priority(PRIORITY_HIGH if command_word in ADMIN_COMMANDS else PRIORITY_NORMAL):
+                handler_func(bot=bot, msg_from_id=msg_from_id, args_str=args_str, channel_id=msg_channel_id, sender_nick=sender_nick, command=command_word, msg_type=msg_type)
         except Exception as e:
-            logging.error(f"Error executing command '{command_word}': {e}", exc_info=True)
+            bot.logger.error(f"Error executing command '{command_word}': {e}", exc_info=True, extra={'user_id': msg_from_id, 'channel_id': msg_channel_id, 'command': command_word})
             bot._send_pm(msg_from_id, f"An unexpected error occurred executing '{command_word}'.")
 
 def check_word_filter(bot, user_id, channel_id, user_nick, message):
     if not bot.filter_enabled or not bot.filtered_words: return False
     
-    msg_lower = message.lower()
-    found_bad_word = next((word for word in bot.filtered_words if re.search(r'\b' + re.escape(word) + r'\b', msg_lower, re.IGNORECASE)), None)
+    found_bad_word = bot.word_filter.find(message)
     
     if found_bad_word:
         bot.warning_counts[user_id] = bot.warning_counts.get(user_id, 0) + 1
         warning_msg = f"Warning {bot.warning_counts[user_id]}/3 for {user_nick}: Please avoid inappropriate language."
-        bot._send_channel_message(channel_id, warning_msg)
+        bot._send_channel_message(channel_id, warning_msg, priority=PRIORITY_HIGH)
 
         if bot.warning_counts[user_id] >= 3:
             if bot.my_rights & UserRight.USERRIGHT_KICK_USERS:
                 bot.doKickUser(user_id, channel_id)
-                bot._send_channel_message(channel_id, f"User {user_nick} kicked after 3 warnings.")
+                bot._send_channel_message(channel_id, f"User {user_nick} kicked after 3 warnings.", priority=PRIORITY_HIGH)
             else:
-                bot._send_channel_message(channel_id, f"{user_nick} has 3 warnings, but bot cannot kick.")
+                bot._send_channel_message(channel_id, f"{user_nick} has 3 warnings, but bot cannot kick.", priority=PRIORITY_HIGH)
             bot.warning_counts[user_id] = 0
         return True
     return False
\ No newline at end of file
@@ -35,9 +35,22 @@ def handle_broadcast_message(bot, msg_from_id, args_str, **kwargs):
     else:
         bot._send_pm(msg_from_id, "Failed to send broadcast (check rights/lock status).")
 
+def _send_reply(bot, msg_from_id, channel_id, msg_type, reply):
+    if msg_type == TeamTalk5.TextMsgType.MSGTYPE_USER:
+        bot._send_pm(msg_from_id, reply)
+    else:
+        bot._send_channel_message(channel_id, reply)
+
+def _submit_hariku_lookup(bot, msg_from_id, channel_id, msg_type, lookup):
+    # Hariku requests can take seconds; they run on a worker and the reply is sent from the event loop
+    bot.submit_ai_job(
+        lookup,
+        lambda reply: _send_reply(bot, msg_from_id, channel_id, msg_type, reply),
+        on_error=lambda error: _send_reply(bot, msg_from_id, channel_id, msg_type, "[Hariku API Error] An unexpected error occurred."),
+        owner=msg_from_id)
+
 def handle_quote(bot, msg_from_id, channel_id, args_str, msg_type, **kwargs):
     args = args_str.strip().split()
-    reply = ""
     
     # Default language and ID
     lang = "en" # Default for random quote
@@ -54,20 +67,15 @@ def handle_quote(bot, msg_from_id, channel_id, args_str, msg_type, **kwargs):
             lang = "id" # Default to Indonesian if only ID is provided
 
     if quote_id is not None:
-        reply = bot.hariku_service.get_quote_by_id(quote_id, lang)
+        lookup = lambda: bot.hariku_service.get_quote_by_id(quote_id, lang)
     else:
-        reply = bot.hariku_service.get_random_quote(lang)
-    
-    if msg_type == TeamTalk5.TextMsgType.MSGTYPE_USER:
-        bot._send_pm(msg_from_id, reply)
-    else:
-        bot._send_channel_message(channel_id, reply)
+        lookup = lambda: bot.hariku_service.get_random_quote(lang)
+    _submit_hariku_lookup(bot, msg_from_id, channel_id, msg_type, lookup)
 
 def handle_event(bot, msg_from_id, channel_id, args_str, msg_type, **kwargs):
     args = args_str.strip().split()
     country_code = "ID" # Default country code
     date_str = None
-    reply = ""
 
     if args:
         # Check if the first argument is a country code (e.g., ID, US)
@@ -82,25 +90,22 @@ def handle_event(bot, msg_from_id, channel_id, args_str, msg_type, **kwargs):
         try:
             # Try to parse as YYYY-MM-DD (week)
             datetime.strptime(date_str, '%Y-%m-%d')
-            reply = bot.hariku_service.get_events_by_week(country_code, date_str)
+            lookup = lambda: bot.hariku_service.get_events_by_week(country_code, date_str)
         except ValueError:
             try:
                 # Try to parse as YYYY-MM (month)
                 datetime.strptime(date_str, '%Y-%m')
-                reply = bot.hariku_service.get_events_by_month(country_code, date_str)
+                lookup = lambda: bot.hariku_service.get_events_by_month(country_code, date_str)
             except ValueError:
                 try:
                     # Try to parse as YYYY (year)
                     datetime.strptime(date_str, '%Y')
-                    reply = bot.hariku_service.get_events_by_year(country_code, date_str)
+                    lookup = lambda: bot.hariku_service.get_events_by_year(country_code, date_str)
                 except ValueError:
                     # If not a date, assume it's a search query
-                    reply = bot.hariku_service.search_events(country_code, args_str.strip())
+                    lookup = lambda: bot.hariku_service.search_events(country_code, args_str.strip())
     else:
         # If no date is provided, get today's events
-        reply = bot.hariku_service.get_today_events(country_code)
+        lookup = lambda: bot.hariku_service.get_today_events(country_code)
 
-    if msg_type == TeamTalk5.TextMsgType.MSGTYPE_USER:
-        bot._send_pm(msg_from_id, reply)
-    else:
-        bot._send_channel_message(channel_id, reply)
+    _submit_hariku_lookup(bot, msg_from_id, channel_id, msg_type, lookup)
@@ -39,6 +39,11 @@ def handle_help(bot, msg_from_id, **kwargs):
             "- addword <word>: Adds a word to the word filter.",
             "- delword <word>: Removes a word from the word filter.",
             "- set_context_retention: Set context history retention.",
+            "- cachestats: Show response cache hit/miss counters.",
+            "- flush_gemini_cache / fgc: Clear cached Gemini responses.",
+            "- set_ai_rate_limit <user|channel> <per_minute> [burst]: Limit AI requests per user or channel.",
+            "- ai_queue_stats / aqs: Show AI queue depth, wait times and rate-limit rejections.",
+            "- outbound_stats / obs: Show the outgoing message queue and dropped incoming messages.",
             "- jcl: Toggle join/leave announcements.",
             "- tg_chanmsg: Toggle channel messages.",
             "- tg_broadcast: Toggle broadcast messages.",
@@ -79,6 +84,8 @@ def handle_info(bot, msg_from_id, **kwargs):
     gemini_status = "ENABLED" if bot.gemini_service.is_enabled() else "DISABLED"
     debug_logging_status = "ENABLED" if bot.config['Bot']['debug_logging_enabled'] else "DISABLED"
     context_history_status = "ENABLED" if bot.config['Bot']['context_history_enabled'] else "DISABLED"
+    history_stats = bot.context_history_manager.get_stats()
+    context_history_status += f" ({history_stats['keys']} keys, {history_stats['messages']} messages, {history_stats['bytes'] / 1024:.1f} KB)"
     gemini_api_key_status = "SET" if bot.config['Bot']['gemini_api_key'] else "NOT SET"
 
     server_name, server_version = "N/A", "N/A"
@@ -121,11 +128,11 @@ def handle_info(bot, msg_from_id, **kwargs):
 
 def handle_whoami(bot, msg_from_id, sender_nick, **kwargs):
     try:
-        user = bot.getUser(msg_from_id)
+        user = bot.get_user_snapshot(msg_from_id)
         if not user:
             raise ValueError("Could not get user info")
         admin_status = "Yes" if bot._is_admin(msg_from_id) else "No"
-        bot._send_pm(msg_from_id, f"Nick: {sender_nick}\nID: {user.nUserID}\nUser: {ttstr(user.szUsername)}\nAdmin: {admin_status}")
+        bot._send_pm(msg_from_id, f"Nick: {sender_nick}\nID: {user.user_id}\nUser: {user.username}\nAdmin: {admin_status}")
     except Exception as e:
         bot._send_pm(msg_from_id, f"Error getting your info: {e}")
 
@@ -190,6 +197,14 @@ ADMIN_COMMANDS = {
     "addword": config_management.handle_add_word,
     "delword": config_management.handle_del_word,
     "set_context_retention": config_management.handle_set_context_retention,
+    "cachestats": config_management.handle_cache_stats,
+    "flush_gemini_cache": config_management.handle_flush_gemini_cache,
+    "fgc": config_management.handle_flush_gemini_cache,
+    "set_ai_rate_limit": config_management.handle_set_ai_rate_limit,
+    "ai_queue_stats": config_management.handle_ai_queue_stats,
+    "aqs": config_management.handle_ai_queue_stats,
+    "outbound_stats": config_management.handle_outbound_stats,
+    "obs": config_management.handle_outbound_stats,
     # Admin - Feature Toggles
     "jcl": feature_toggles.handle_toggle_jcl,
     "tg_chanmsg": feature_toggles.handle_toggle_chanmsg,
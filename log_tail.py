@@ -0,0 +1,108 @@
+import mmap
+import os
+
+BLOCK_SIZE = 8192
+MAX_INCREMENT_BYTES = 1024 * 1024 # A 'since' read further behind than this falls back to a plain tail
+
+def _file_id(stat_result) -> int:
+    return stat_result.st_ino
+
+def make_cursor(stat_result, offset: int) -> str:
+    # The file identity lets a reader notice that RotatingFileHandler swapped the file underneath it
+    return f"{_file_id(stat_result)}:{offset}"
+
+def parse_cursor(cursor: str):
+    try:
+        file_id, offset = cursor.split(":", 1)
+        return int(file_id), int(offset)
+    except (AttributeError, ValueError):
+        return None
+
+def _complete_end(data: bytes) -> int:
+    # Only hand out whole lines; a line still being written is picked up by the next read
+    return data.rfind(b"\n") + 1
+
+def _decode_lines(data: bytes) -> list[str]:
+    return data.decode("utf-8", errors="replace").splitlines()
+
+def _tail_bytes(f, size: int, limit: int, use_mmap: bool):
+    """(data, end): the last `limit` complete lines of the first `size` bytes, read backwards, and the offset after them."""
+    if size <= 0 or limit <= 0: return b"", 0
+    if use_mmap:
+        with mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) as mm:
+            end = mm.rfind(b"\n", 0, size) + 1
+            start = end - 1
+            for _ in range(limit):
+                if start <= 0: start = -1; break
+                start = mm.rfind(b"\n", 0, start)
+            return mm[start + 1:end], end
+
+    chunks, newlines, pos = [], 0, size
+    while pos > 0 and newlines <= limit:
+        read = min(BLOCK_SIZE, pos)
+        pos -= read
+        f.seek(pos)
+        chunk = f.read(read)
+        chunks.append(chunk)
+        newlines += chunk.count(b"\n")
+    data = b"".join(reversed(chunks))
+    complete = _complete_end(data)
+    data = data[:complete]
+    if data.count(b"\n") > limit:
+        # Drop the surplus leading lines (the first one may also be partial)
+        cut = len(data) - 1
+        for _ in range(limit):
+            cut = data.rfind(b"\n", 0, cut)
+        data = data[cut + 1:]
+    return data, pos + complete
+
+def tail(path: str, limit: int, use_mmap: bool = False):
+    """Returns (lines, cursor) for the last `limit` lines of path. Cost depends on the lines read, not the file size."""
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        data, end = _tail_bytes(f, st.st_size, limit, use_mmap)
+        return _decode_lines(data), make_cursor(st, end)
+
+def _read_range(path: str, offset: int, expected_id: int = None):
+    """Complete lines from offset to EOF, and the offset after them. None if the file is not the expected one."""
+    try:
+        with open(path, "rb") as f:
+            st = os.fstat(f.fileno())
+            if expected_id is not None and _file_id(st) != expected_id: return None
+            if offset > st.st_size: return None
+            f.seek(offset)
+            data = f.read(st.st_size - offset)
+            end = _complete_end(data)
+            return data[:end], offset + end, st
+    except OSError:
+        return None
+
+def read_since(path: str, cursor: str, limit: int, use_mmap: bool = False):
+    """Returns (lines, cursor, reset) with the lines written after cursor.
+
+    Survives one rotation (the rest of path + '.1', then the new file). reset is True when the
+    cursor could not be followed and the result is a fresh tail instead of a continuation.
+    """
+    parsed = parse_cursor(cursor)
+    if parsed is None: return (*tail(path, limit, use_mmap), True)
+    file_id, offset = parsed
+
+    try:
+        current = os.stat(path)
+    except OSError:
+        return [], cursor, False
+    if _file_id(current) == file_id:
+        if offset > current.st_size or current.st_size - offset > MAX_INCREMENT_BYTES:
+            return (*tail(path, limit, use_mmap), True)
+        result = _read_range(path, offset, file_id)
+        if result is None: return (*tail(path, limit, use_mmap), True)
+        data, end, st = result
+        return _decode_lines(data)[-limit:], make_cursor(st, end), False
+
+    # Rotated: finish the old file (now path.1), then continue from the start of the new one
+    old = _read_range(path + ".1", offset, file_id)
+    new = _read_range(path, 0)
+    if old is None or new is None or len(old[0]) + len(new[0]) > MAX_INCREMENT_BYTES:
+        return (*tail(path, limit, use_mmap), True)
+    lines = _decode_lines(old[0]) + _decode_lines(new[0])
+    return lines[-limit:], make_cursor(new[2], new[1]), False
@@ -1,14 +1,96 @@
+import collections
 import logging
 import sys
+import time
 from logging.handlers import RotatingFileHandler
-from config_manager import load_config # Import load_config function
+from config_manager import config_service
+from event_bus import event_bus
 
 # Define a specific logger for the bot application
 bot_logger = logging.getLogger('bot_app')
 
+class LogEntry:
+    __slots__ = ('seq', 'created', 'levelno', 'logger', 'message', 'context')
+
+    def __init__(self, seq, created, levelno, logger, message, context):
+        self.seq = seq
+        self.created = created
+        self.levelno = levelno
+        self.logger = logger
+        self.message = message
+        self.context = context
+
+    def to_dict(self) -> dict:
+        millis = int((self.created % 1) * 1000)
+        entry = {
+            "seq": self.seq,
+            "time": f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.created))},{millis:03d}",
+            "level": logging.getLevelName(self.levelno),
+            "logger": self.logger,
+            "message": self.message,
+        }
+        if self.context: entry["context"] = self.context
+        return entry
+
+class RingBufferLogHandler(logging.Handler):
+    """Keeps the last `capacity` records in memory as compact entries, for log viewing without disk I/O.
+
+    Every entry gets an increasing sequence number that doubles as a query cursor. New entries are
+    also pushed to event bus listeners (the web UI's live log view).
+    """
+    CONTEXT_FIELDS = ('user_id', 'channel_id', 'command') # Picked up from logging's extra={...}
+
+    def __init__(self, capacity: int = 2000):
+        super().__init__()
+        self._entries = collections.deque(maxlen=max(1, int(capacity)))
+        self._next_seq = 1
+
+    @property
+    def capacity(self) -> int:
+        return self._entries.maxlen
+
+    def resize(self, capacity: int):
+        with self.lock:
+            self._entries = collections.deque(self._entries, maxlen=max(1, int(capacity)))
+
+    def emit(self, record):
+        try:
+            message = record.getMessage()
+            if record.exc_info and not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            if record.exc_text: message = f"{message}\n{record.exc_text}"
+            context = {field: getattr(record, field) for field in self.CONTEXT_FIELDS if hasattr(record, field)}
+            with self.lock:
+                entry = LogEntry(self._next_seq, record.created, record.levelno, record.name, message, context or None)
+                self._next_seq += 1
+                self._entries.append(entry)
+            if event_bus.has_subscribers: event_bus.publish("log", entry.to_dict())
+        except Exception:
+            self.handleError(record)
+
+    def query(self, level=None, text=None, cursor: int = 0, limit: int = 500):
+        """Entries after cursor, oldest first, filtered by minimum level and case-insensitive text.
+
+        Returns (entries, next_cursor, reset); reset means entries after cursor were already dropped
+        from the buffer (or the cursor is from before a restart), so the caller should start over.
+        """
+        min_level = logging.getLevelName(level.upper()) if level else 0
+        if not isinstance(min_level, int): min_level = 0 # Unknown level names filter nothing
+        needle = text.lower() if text else None
+        with self.lock:
+            entries = list(self._entries)
+            next_seq = self._next_seq
+        oldest = entries[0].seq if entries else next_seq
+        reset = cursor > next_seq - 1 or (cursor > 0 and cursor < oldest - 1)
+        if reset: cursor = 0
+        matches = [e for e in entries if e.seq > cursor and e.levelno >= min_level and (needle is None or needle in e.message.lower())]
+        return [e.to_dict() for e in matches[-limit:]], next_seq - 1, reset
+
+log_buffer = RingBufferLogHandler()
+
 def setup_logging():
     # Load configuration to determine logging level
-    config = load_config()
+    config = config_service.get()
     
     # If config is None (e.g., config.ini not found), default to False for debug_logging_enabled
     debug_logging_enabled = False
@@ -39,6 +121,8 @@ def setup_logging():
     # Attach handlers to the specific bot_logger, not the root logger
     bot_logger.addHandler(file_handler)
     bot_logger.addHandler(console_handler)
+    if config and config['Bot'].get('log_buffer_size'): log_buffer.resize(config['Bot']['log_buffer_size'])
+    bot_logger.addHandler(log_buffer)
 
     # Set logging level for google.generativeai to INFO
     logging.getLogger('google.generativeai').setLevel(logging.INFO)
@@ -0,0 +1,89 @@
+import collections
+import logging
+import time
+
+class _Partial:
+    __slots__ = ('parts', 'size', 'updated', 'discarding')
+
+    def __init__(self, now: float):
+        self.parts = [] # raw szMessage fragments: bytes, or str on Windows
+        self.size = 0
+        self.updated = now
+        self.discarding = False # Over the size cap: swallow fragments until the final one
+
+class MessageReassembler:
+    """Joins bMore text message fragments back into whole messages.
+
+    Fragments are kept raw and decoded once when the last one arrives, so a UTF-8 character split
+    across fragments survives. Partial messages are capped in size and count and expire if their
+    final fragment never arrives.
+    """
+
+    def __init__(self, max_message_bytes: int = 65536, fragment_timeout: float = 30.0, max_partials: int = 256):
+        self.max_message_bytes = max(1, int(max_message_bytes))
+        self.fragment_timeout = float(fragment_timeout)
+        self.max_partials = max(1, int(max_partials))
+        self._partials = collections.OrderedDict() # key -> _Partial, least recently updated first
+        self.dropped_oversize = self.dropped_timeout = self.dropped_overflow = 0
+
+    def __len__(self): return len(self._partials)
+
+    @staticmethod
+    def _decode(parts) -> str:
+        if not parts: return ""
+        if isinstance(parts[0], str): return "".join(parts)
+        return b"".join(parts).decode('utf-8', errors='replace')
+
+    def add(self, key, fragment, more: bool):
+        """Adds a fragment for key. Returns the whole message once complete, otherwise None."""
+        now = time.monotonic()
+        self._expire(now)
+        partial = self._partials.pop(key, None)
+        if partial is None:
+            if not more: return self._decode([fragment]) # Single-fragment message, the common case
+            partial = _Partial(now)
+
+        if not partial.discarding:
+            # Windows builds hand over str fragments; the cap is in UTF-8 bytes either way
+            partial.size += len(fragment.encode('utf-8')) if isinstance(fragment, str) else len(fragment)
+            if partial.size > self.max_message_bytes:
+                self.dropped_oversize += 1
+                logging.warning(f"Dropping oversized message from {key} ({partial.size} > {self.max_message_bytes} bytes).")
+                partial.parts, partial.discarding = [], True
+            else:
+                partial.parts.append(fragment)
+
+        if not more:
+            return None if partial.discarding else self._decode(partial.parts)
+
+        partial.updated = now
+        self._partials[key] = partial
+        if len(self._partials) > self.max_partials:
+            oldest, _ = self._partials.popitem(last=False)
+            self.dropped_overflow += 1
+            logging.warning(f"Too many partial messages; dropped the oldest from {oldest}.")
+        return None
+
+    def expire(self):
+        """Drops partial messages whose next fragment is overdue. Cheap when none are."""
+        if self._partials: self._expire(time.monotonic())
+
+    def _expire(self, now: float):
+        cutoff = now - self.fragment_timeout
+        while self._partials:
+            key, partial = next(iter(self._partials.items()))
+            if partial.updated >= cutoff: break
+            del self._partials[key]
+            if not partial.discarding: self.dropped_timeout += 1
+            logging.debug(f"Partial message from {key} timed out.")
+
+    def clear(self):
+        self._partials.clear()
+
+    def get_stats(self) -> dict:
+        return {
+            "partials": len(self._partials),
+            "dropped_oversize": self.dropped_oversize,
+            "dropped_timeout": self.dropped_timeout,
+            "dropped_overflow": self.dropped_overflow,
+        }
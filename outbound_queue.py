@@ -0,0 +1,211 @@
+import collections
+import contextlib
+import logging
+import threading
+import time
+
+PRIORITY_HIGH = 0   # Admin replies and moderation
+PRIORITY_NORMAL = 1 # Command replies, announcements
+PRIORITY_LOW = 2    # AI chatter
+_PRIORITIES = (PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW)
+
+class _Item:
+    __slots__ = ('text', 'size', 'enqueued_at', 'packets', 'next_packet')
+
+    def __init__(self, text: str, enqueued_at: float):
+        self.text = text
+        self.size = len(text.encode('utf-8'))
+        self.enqueued_at = enqueued_at
+        self.packets = None # Created when the item reaches the front of its queue
+        self.next_packet = None
+
+class _Destination:
+    __slots__ = ('queues', 'next_send')
+
+    def __init__(self):
+        self.queues = tuple(collections.deque() for _ in _PRIORITIES)
+        self.next_send = 0.0
+
+class OutboundQueue:
+    """Paces outgoing text messages so bursts don't trip the server's flood protection.
+
+    enqueue() never blocks; drain() is called from the event loop and sends whatever the pacing
+    allows: at most messages_per_second overall, and one message per destination_interval to each
+    destination. Higher priorities go first, tiny consecutive messages to the same destination are
+    merged, and when max_pending is reached the lowest-priority messages are dropped first.
+
+    packetize(destination, text) turns a queued message into the packets actually sent; it is run
+    lazily, so a long message is paced packet by packet.
+    """
+
+    def __init__(self, messages_per_second: float = 4.0, destination_interval: float = 0.3, max_pending: int = 300,
+                 coalesce_bytes: int = 256, packetize=None):
+        self._lock = threading.Lock() # The GUI thread sends too
+        self.coalesce_bytes = coalesce_bytes
+        self._local = threading.local() # Per-thread priority override set by using_priority()
+        self._packetize = packetize or (lambda destination, text: (text,))
+        self._destinations = {} # destination key -> _Destination, while it has messages or is still in its pacing window
+        self._pending = [0] * len(_PRIORITIES)
+        self._refilled_at = time.monotonic()
+        self.sent = self.dropped = self.coalesced = self.failed = 0
+        self._tokens = None # Starts with a full burst
+        self.configure(messages_per_second, destination_interval, max_pending)
+
+    def configure(self, messages_per_second: float, destination_interval: float, max_pending: int):
+        # Already-queued messages stay; a lower max_pending only applies to new ones
+        with self._lock:
+            self.messages_per_second = max(0.1, float(messages_per_second))
+            self.destination_interval = max(0.0, float(destination_interval))
+            self.max_pending = max(1, int(max_pending))
+            self._burst = max(1.0, self.messages_per_second)
+            self._tokens = self._burst if self._tokens is None else min(self._tokens, self._burst)
+
+    def __len__(self): return sum(self._pending)
+
+    @property
+    def default_priority(self) -> int:
+        return getattr(self._local, 'priority', PRIORITY_NORMAL)
+
+    @contextlib.contextmanager
+    def using_priority(self, priority: int):
+        # Sends made inside the block, on this thread, without an explicit priority use this one
+        previous = getattr(self._local, 'priority', PRIORITY_NORMAL)
+        self._local.priority = priority
+        try:
+            yield
+        finally:
+            self._local.priority = previous
+
+    def enqueue(self, destination, text: str, priority: int = None) -> bool:
+        """Queues text for destination. Returns False if it was dropped because the queue is full."""
+        priority = self.default_priority if priority is None else priority
+        with self._lock:
+            return self._enqueue_locked(destination, text, priority)
+
+    def _enqueue_locked(self, destination, text, priority):
+        now = time.monotonic()
+        dest = self._destinations.get(destination)
+        queue = dest.queues[priority] if dest else None
+        item = _Item(text, now)
+        if queue and queue[-1].packets is None and queue[-1].size + 1 + item.size <= self.coalesce_bytes:
+            last = queue[-1]
+            last.text += "\n" + text
+            last.size += 1 + item.size
+            self.coalesced += 1
+            return True
+        if len(self) >= self.max_pending and not self._evict_below(priority):
+            self.dropped += 1
+            logging.warning(f"Outbound queue full ({self.max_pending}); dropped message to {destination}.")
+            return False
+        if dest is None: dest = self._destinations[destination] = _Destination()
+        dest.queues[priority].append(item)
+        self._pending[priority] += 1
+        return True
+
+    def _evict_below(self, priority: int) -> bool:
+        # Make room by dropping the newest message of the lowest priority below the incoming one
+        for victim in reversed(_PRIORITIES):
+            if victim <= priority: return False
+            if not self._pending[victim]: continue
+            newest_key, newest = None, None
+            for key, dest in self._destinations.items():
+                queue = dest.queues[victim]
+                if queue and (newest is None or queue[-1].enqueued_at > newest.enqueued_at):
+                    newest_key, newest = key, queue[-1]
+            self._destinations[newest_key].queues[victim].pop()
+            self._pending[victim] -= 1
+            self._forget_if_empty(newest_key)
+            self.dropped += 1
+            return True
+        return False
+
+    def _forget_if_empty(self, key):
+        dest = self._destinations.get(key)
+        if dest and not any(dest.queues) and dest.next_send <= time.monotonic():
+            del self._destinations[key]
+
+    def _refill(self, now):
+        self._tokens = min(self._burst, self._tokens + (now - self._refilled_at) * self.messages_per_second)
+        self._refilled_at = now
+
+    def _next_ready(self, now):
+        best = None # (priority, enqueued_at, key)
+        for key, dest in self._destinations.items():
+            if dest.next_send > now: continue
+            for priority, queue in enumerate(dest.queues):
+                if queue:
+                    candidate = (priority, queue[0].enqueued_at, key)
+                    if best is None or candidate < best: best = candidate
+                    break
+        return best
+
+    def _take_packet(self, dest, priority, key):
+        queue = dest.queues[priority]
+        item = queue[0]
+        if item.packets is None:
+            item.packets = iter(self._packetize(key, item.text))
+            item.next_packet = next(item.packets, None)
+        packet, item.next_packet = item.next_packet, next(item.packets, None)
+        if item.next_packet is None:
+            queue.popleft()
+            self._pending[priority] -= 1
+        return packet
+
+    def drain(self, send) -> int:
+        """Sends due packets via send(destination, packet) -> bool. Returns how many were sent."""
+        if not self._destinations: return 0
+        batch = []
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            while self._tokens >= 1:
+                best = self._next_ready(now)
+                if best is None: break
+                priority, _, key = best
+                dest = self._destinations[key]
+                packet = self._take_packet(dest, priority, key)
+                if packet is None: continue
+                batch.append((key, packet))
+                self._tokens -= 1
+                dest.next_send = now + self.destination_interval
+            for key in [k for k, d in self._destinations.items() if not any(d.queues)]:
+                self._forget_if_empty(key)
+        sent = sum(1 for key, packet in batch if send(key, packet))
+        with self._lock:
+            self.sent += sent
+            self.failed += len(batch) - sent
+        return sent
+
+    def seconds_until_due(self):
+        """Time until drain() could send something, or None if nothing is queued."""
+        if not len(self): return None
+        now = time.monotonic()
+        token_wait = 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.messages_per_second
+        dest_wait = min((d.next_send - now for d in self._destinations.values() if any(d.queues)), default=0.0)
+        return max(0.0, token_wait, dest_wait)
+
+    def clear(self):
+        with self._lock:
+            dropped = len(self)
+            self._destinations.clear()
+            self._pending = [0] * len(_PRIORITIES)
+        return dropped
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return self._stats_locked()
+
+    def _stats_locked(self):
+        now = time.monotonic()
+        oldest = min((q[0].enqueued_at for d in self._destinations.values() for q in d.queues if q), default=now)
+        return {
+            "pending": len(self),
+            "pending_by_priority": tuple(self._pending),
+            "destinations": sum(1 for d in self._destinations.values() if any(d.queues)),
+            "oldest_wait": now - oldest,
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "max_pending": self.max_pending,
+        }
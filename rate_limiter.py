@@ -0,0 +1,86 @@
+import contextlib
+import threading
+import time
+
+class TokenBucket:
+    __slots__ = ('tokens', 'updated')
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+class RateLimiter:
+    """Token-bucket limiter keyed by an arbitrary string (a user, a channel...).
+
+    rate_per_minute=0 disables limiting. Buckets that have refilled completely are dropped,
+    so idle keys cost nothing.
+    """
+
+    def __init__(self, rate_per_minute: float = 0, burst: int = 1):
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self.rejected = 0
+        self.configure(rate_per_minute, burst)
+
+    def configure(self, rate_per_minute: float, burst: int = None):
+        with self._lock:
+            self.rate_per_minute = max(0.0, float(rate_per_minute))
+            if burst is not None: self.burst = max(1, int(burst))
+            self._buckets.clear()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate_per_minute > 0
+
+    def _refilled(self, key, now):
+        bucket = self._buckets.get(key)
+        if bucket is None: return None
+        bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate_per_minute / 60.0)
+        bucket.updated = now
+        if bucket.tokens >= self.burst:
+            del self._buckets[key]
+            return None
+        return bucket
+
+    def _retry_after_locked(self, key, now) -> float:
+        if not self.enabled: return 0.0
+        bucket = self._refilled(key, now)
+        if bucket is None or bucket.tokens >= 1: return 0.0
+        return (1 - bucket.tokens) * 60.0 / self.rate_per_minute
+
+    def _consume_locked(self, key, now):
+        if not self.enabled: return
+        bucket = self._refilled(key, now) or self._buckets.setdefault(key, TokenBucket(float(self.burst), now))
+        bucket.tokens -= 1
+
+    def retry_after(self, key) -> float:
+        """Seconds until key may make another request; 0 if it may now."""
+        with self._lock:
+            return self._retry_after_locked(key, time.monotonic())
+
+    def consume(self, key):
+        with self._lock:
+            self._consume_locked(key, time.monotonic())
+
+    def __len__(self): return len(self._buckets)
+
+def check_limits(limits) -> float:
+    """Takes [(RateLimiter, key), ...]; consumes from all of them only if every one allows it.
+
+    Returns 0 when the request may proceed, otherwise the longest wait in seconds.
+    """
+    # Check and consume under every limiter's lock at once, so concurrent callers can't take a user
+    # token and then fail the channel check. Locks are taken in a fixed order to avoid deadlocks.
+    limiters = sorted({id(limiter): limiter for limiter, _ in limits}.values(), key=id)
+    with contextlib.ExitStack() as stack:
+        for limiter in limiters: stack.enter_context(limiter._lock)
+        now = time.monotonic()
+        waits = [(limiter, key, limiter._retry_after_locked(key, now)) for limiter, key in limits]
+        wait = max((w for _, _, w in waits), default=0.0)
+        if wait > 0:
+            for limiter, _, w in waits:
+                if w > 0: limiter.rejected += 1
+            return wait
+        for limiter, key, _ in waits:
+            limiter._consume_locked(key, now)
+    return 0.0
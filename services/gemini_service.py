@@ -1,5 +1,7 @@
 
+import hashlib
 import logging
+import re
 import threading
 try:
     import google.generativeai as genai
@@ -7,6 +9,7 @@ try:
     GEMINI_AVAILABLE = True
 except ImportError:
     GEMINI_AVAILABLE = False
+from services.response_cache import TTLCache
 
 GEMINI_SAFETY_SETTINGS = [
     {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
@@ -15,8 +18,26 @@ GEMINI_SAFETY_SETTINGS = [
     {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
 ]
 
+def _normalize_prompt(prompt: str) -> str:
+    # "What  is TeamTalk?" and "what is teamtalk? " share a cache entry
+    return re.sub(r'\s+', ' ', str(prompt)).strip().casefold()
+
+# A flush point: end of a sentence followed by whitespace, or a paragraph break
+_SENTENCE_END = re.compile(r'(?:[.!?\u2026]["\')\]]*\s+|\n\s*\n)')
+STREAM_MIN_CHUNK = 80
+_TOOL_CALL = object() # Returned by a stream that asks for a tool before sending anything
+
+def _split_complete_sentences(buffer: str, min_chunk: int = STREAM_MIN_CHUNK):
+    """Splits buffer into (complete sentences ready to send, remainder still being streamed)."""
+    if len(buffer) < min_chunk: return "", buffer
+    last_end = 0
+    for match in _SENTENCE_END.finditer(buffer):
+        last_end = match.end()
+    if last_end < min_chunk: return "", buffer
+    return buffer[:last_end], buffer[last_end:]
+
 class GeminiService:
-    def __init__(self, api_key, context_history_enabled=True, model_name: str = 'gemini-1.5-flash-latest', system_instructions: str = '', welcome_instructions: str = '', hariku_service=None):
+    def __init__(self, api_key, context_history_enabled=True, model_name: str = 'gemini-1.5-flash-latest', system_instructions: str = '', welcome_instructions: str = '', hariku_service=None, response_cache=None, history_char_budget: int = 0, summarize_history: bool = False):
         self.api_key = api_key
         self._model_name = self._strip_model_prefix(model_name)
         self.model = None
@@ -26,6 +47,10 @@ class GeminiService:
         self._welcome_instructions = welcome_instructions # New attribute for welcome message instructions
         self._semaphore = threading.Semaphore(5) # Limit to 5 concurrent API calls
         self.hariku_service = hariku_service
+        self.response_cache = response_cache # Optional TTLCache; None disables response caching
+        self.history_char_budget = max(0, int(history_char_budget)) # 0 = send all retained history
+        self.summarize_history = summarize_history
+        self._summaries = TTLCache(max_entries=1024, default_ttl=3600, name="history_summaries")
         self.init_model()
 
     def _strip_model_prefix(self, model_name: str) -> str:
@@ -95,6 +120,10 @@ class GeminiService:
     def get_current_model_name(self):
         return self._add_model_prefix(self._model_name)
 
+    def uses_model(self, model_name: str) -> bool:
+        # True if model_name (with or without the models/ prefix) is loaded and usable
+        return self.is_enabled() and self._strip_model_prefix(model_name) == self._model_name
+
     def _get_hariku_tools(self):
         tools = []
         if self.hariku_service and self.hariku_service.is_enabled():
@@ -119,131 +148,187 @@ class GeminiService:
             logging.error(f"Failed to list Gemini models: {e}")
             return []
 
-    def generate_content(self, prompt, history=None):
+    def _cache_key(self, system_instructions, prompt, formatted_history=None):
+        # History only shares a cache entry when the whole conversation so far is identical
+        history_fingerprint = ""
+        if formatted_history:
+            digest = hashlib.sha1()
+            for entry in formatted_history:
+                digest.update(entry['role'].encode('utf-8') + b'\0' + entry['parts'][0].encode('utf-8') + b'\0')
+            history_fingerprint = digest.hexdigest()
+        instructions_hash = hashlib.sha1((system_instructions or '').encode('utf-8')).hexdigest()
+        return (self._model_name, instructions_hash, history_fingerprint, _normalize_prompt(prompt))
+
+    def _cached_call(self, cache_key, call):
+        # call() returns (text, cacheable); only plain model text is cached, never errors or tool results
+        if self.response_cache is None or cache_key is None:
+            return call()[0]
+        return self.response_cache.get_or_load(cache_key, call, should_cache=lambda result: result[1])[0]
+
+    def flush_response_cache(self) -> int:
+        return self.response_cache.clear() if self.response_cache is not None else 0
+
+    def get_cache_stats(self):
+        return self.response_cache.stats() if self.response_cache is not None else None
+
+    @staticmethod
+    def _history_cost(msg) -> int:
+        return len(msg.message) + (0 if msg.is_bot else len(msg.sender_nick) + 2)
+
+    def _window_history(self, history, context_key=None):
+        """Keeps the newest turns that fit history_char_budget; older turns are dropped or summarised."""
+        if not self.history_char_budget: return history, None
+        used, start = 0, len(history)
+        while start > 0:
+            cost = self._history_cost(history[start - 1])
+            if used + cost > self.history_char_budget: break
+            used += cost
+            start -= 1
+        if start == 0: return history, None
+        logging.debug(f"History window for {context_key}: keeping {len(history) - start} of {len(history)} turns ({used} chars).")
+        summary = self._rolling_summary(context_key, history[:start]) if self.summarize_history and context_key else None
+        return history[start:], summary
+
+    def _rolling_summary(self, context_key, dropped):
+        # Cached per key as (timestamp of the newest summarised turn, summary); only newly dropped turns are folded in
+        upto, summary = self._summaries.get(context_key) or (float('-inf'), "")
+        new_turns = [msg for msg in dropped if msg.timestamp > upto]
+        if not new_turns: return summary or None
+        transcript = "\n".join(msg.message if msg.is_bot else f"{msg.sender_nick}: {msg.message}" for msg in new_turns)
+        prompt = ("Update this running summary of a chat conversation with the new messages below. "
+                  "Keep names, facts and open questions; answer with the summary only, in at most 120 words.\n\n"
+                  f"Current summary: {summary or '(none)'}\n\nNew messages:\n{transcript}")
+        try:
+            with self._semaphore:
+                response = genai.GenerativeModel(self._model_name).generate_content(prompt, stream=False, safety_settings=GEMINI_SAFETY_SETTINGS)
+            text = response.text.strip()
+        except Exception as e:
+            logging.warning(f"Could not summarise history for {context_key}: {e}")
+            return summary or None
+        if text:
+            summary = text
+            self._summaries.set(context_key, (new_turns[-1].timestamp, summary))
+        return summary or None
+
+    def _format_history(self, history, context_key=None):
+        formatted_history = []
+        if history and self.context_history_enabled:
+            history, summary = self._window_history(history, context_key)
+            if summary:
+                formatted_history.append({'role': 'user', 'parts': [f"Summary of our earlier conversation: {summary}"]})
+                formatted_history.append({'role': 'model', 'parts': ["Understood."]})
+            # Format history for Gemini chat
+            for msg in history:
+                role = "model" if msg.is_bot else "user"
+                if msg.is_bot:
+                    formatted_message = msg.message
+                else:
+                    formatted_message = f"{msg.sender_nick}: {msg.message}"
+                formatted_history.append({'role': role, 'parts': [formatted_message]})
+        return formatted_history
+
+    def generate_content(self, prompt, history=None, context_key=None):
         if not self.is_enabled():
             return "[Gemini Error] Service not available."
 
-        try:
+        formatted_history = self._format_history(history, context_key)
+
+        def call():
             with self._semaphore:
-                if history and self.context_history_enabled:
-                    # Format history for Gemini chat
-                    formatted_history = []
-                    for msg in history:
-                        role = "model" if msg['is_bot'] else "user"
-                        if msg['is_bot']:
-                            formatted_message = msg['message']
-                        else:
-                            formatted_message = f"{msg['sender_nick']}: {msg['message']}"
-                        formatted_history.append({'role': role, 'parts': [formatted_message]})
-                    
+                if formatted_history:
                     chat = self.model.start_chat(history=formatted_history)
                     response = chat.send_message(prompt, stream=False, safety_settings=GEMINI_SAFETY_SETTINGS)
                 else:
                     response = self.model.generate_content(prompt, stream=False, safety_settings=GEMINI_SAFETY_SETTINGS)
-                
-                if response.candidates and response.candidates[0].content.parts:
-                    logging.debug(f"Gemini response parts: {response.candidates[0].content.parts}")
-                    full_text_from_parts = ""
-
-                    for part in response.candidates[0].content.parts:
-                        if hasattr(part, 'function_call'):
-                            fc = part.function_call
-                            if not fc.name:
-                                logging.warning("Gemini requested an empty function call name. Skipping tool execution.")
-                                continue
-
-                            logging.info(f"Gemini requested function call: {fc.name} with args {fc.args}")
-                            if self.hariku_service:
-                                try:
-                                    func = getattr(self.hariku_service, fc.name)
-                                    args_dict = {key: getattr(fc.args, key) for key in fc.args.keys()}
-                                    tool_result = func(**args_dict)
-                                    logging.info(f"Hariku tool result: {tool_result}")
-                                    return tool_result
-                                except AttributeError:
-                                    logging.error(f"HarikuService does not have method: {fc.name}")
-                                    return f"[Gemini Error] Requested tool '{fc.name}' not found."
-                                except Exception as tool_e:
-                                    logging.error(f"Error executing Hariku tool {fc.name}: {tool_e}", exc_info=True)
-                                    return f"[Gemini Error] Failed to execute tool '{fc.name}': {tool_e}"
-                            else:
-                                return "[Gemini Error] Hariku service not available to execute tool."
-                        elif hasattr(part, 'text'):
-                            full_text_from_parts += part.text
-
-                    if full_text_from_parts.strip():
-                        return full_text_from_parts
-                
-                # Fallback to response.text if no parts or no relevant content in parts
-                if hasattr(response, 'text') and response.text.strip():
-                    return response.text.strip()
-
-                elif hasattr(response, 'prompt_feedback') and response.prompt_feedback.block_reason:
-                     return f"[Gemini Error] Request blocked: {response.prompt_feedback.block_reason.name}"
-
-                return "[Gemini] (Received an empty response or unhandled content)"
-        except StopCandidateException as e:
-            logging.error(f"Gemini StopCandidateException: {e}")
-            if e.candidate and e.candidate.function_calls:
-                for fc in e.candidate.function_calls:
-                    logging.error(f"Malformed function call: {fc.name} with args {fc.args}")
-            return "[Gemini Error] Failed to execute tool. Please check logs for details."
-        except Exception as e:
-            logging.error(f"Error during Gemini API call: {e}", exc_info=True)
-            return "[Bot Error] Error contacting Gemini."
+                return self._process_response(response)
+
+        return self._guarded(lambda: self._cached_call(self._cache_key(self._system_instructions, prompt, formatted_history), call))
 
-    def generate_simple_content(self, prompt: str, model_to_use=None) -> str:
+    def generate_content_stream(self, prompt, on_chunk, history=None, context_key=None):
+        """Like generate_content, but passes the reply to on_chunk(text) in sentence-sized pieces as it arrives.
+
+        on_chunk is called from the calling (worker) thread. Returns the reply text to keep in history:
+        errors are only passed to on_chunk, so after a failure this is the part streamed so far (or "").
+        Replies that need a Hariku tool fall back to the non-streaming path if nothing was sent yet.
+        """
+        if not self.is_enabled():
+            on_chunk("[Gemini Error] Service not available.")
+            return ""
+
+        formatted_history = self._format_history(history, context_key)
+        cache_key = self._cache_key(self._system_instructions, prompt, formatted_history)
+        if self.response_cache is not None:
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                on_chunk(cached[0])
+                return cached[0]
+
+        sent = []
+        def emit(text):
+            sent.append(text)
+            on_chunk(text.strip())
+
+        def stream():
+            with self._semaphore:
+                if formatted_history:
+                    chat = self.model.start_chat(history=formatted_history)
+                    response = chat.send_message(prompt, stream=True, safety_settings=GEMINI_SAFETY_SETTINGS)
+                else:
+                    response = self.model.generate_content(prompt, stream=True, safety_settings=GEMINI_SAFETY_SETTINGS)
+                buffer = ""
+                for chunk in response:
+                    if not chunk.candidates:
+                        if chunk.prompt_feedback and chunk.prompt_feedback.block_reason:
+                            return f"[Gemini Error] Request blocked: {chunk.prompt_feedback.block_reason.name}"
+                        continue
+                    parts = chunk.candidates[0].content.parts
+                    if any(getattr(part, 'function_call', None) and part.function_call.name for part in parts):
+                        if not sent: return _TOOL_CALL # Let the non-streaming path run it
+                        logging.warning("Gemini requested a tool call mid-stream; ignoring it.")
+                        break
+                    buffer += "".join(part.text for part in parts if getattr(part, 'text', None))
+                    ready, buffer = _split_complete_sentences(buffer)
+                    if ready: emit(ready)
+                if buffer.strip(): emit(buffer)
+                return "".join(sent)
+
+        result = self._guarded(stream)
+        partial = "".join(sent).strip()
+        if result is _TOOL_CALL and not sent:
+            # Nothing reached the user yet, so the whole request can be re-issued
+            logging.info("Streaming reply requested a tool call; falling back to non-streaming request.")
+            result = self.generate_content(prompt, history=history, context_key=context_key)
+            on_chunk(result)
+            return result
+        if result is _TOOL_CALL or result != "".join(sent) or not result.strip():
+            # Error, block or empty reply: the user gets it as a follow-up, history only gets what was streamed
+            error = result.strip() if isinstance(result, str) else ""
+            on_chunk(error or "[Gemini] (Received an empty response or unhandled content)")
+            return partial
+        full_text = result.strip()
+        if self.response_cache is not None:
+            self.response_cache.set(cache_key, (full_text, True))
+        return full_text
+
+    def generate_simple_content(self, prompt: str, model_to_use=None, use_cache: bool = True) -> str:
         if not self.is_enabled():
             return "[Gemini Error] Service not available."
-        
+
         if model_to_use is None:
             model_to_use = self.model
+        instructions = self._welcome_instructions if model_to_use is self.welcome_model else self._system_instructions
 
-        try:
+        def call():
             with self._semaphore:
                 response = model_to_use.generate_content(prompt, stream=False, safety_settings=GEMINI_SAFETY_SETTINGS)
-                
-                if response.candidates and response.candidates[0].content.parts:
-                    logging.debug(f"Gemini response parts: {response.candidates[0].content.parts}")
-                    full_text_from_parts = ""
-
-                    for part in response.candidates[0].content.parts:
-                        if hasattr(part, 'function_call'):
-                            fc = part.function_call
-                            if not fc.name:
-                                logging.warning("Gemini requested an empty function call name. Skipping tool execution.")
-                                continue
-
-                            logging.info(f"Gemini requested function call: {fc.name} with args {fc.args}")
-                            if self.hariku_service:
-                                try:
-                                    func = getattr(self.hariku_service, fc.name)
-                                    args_dict = {key: getattr(fc.args, key) for key in fc.args.keys()}
-                                    tool_result = func(**args_dict)
-                                    logging.info(f"Hariku tool result: {tool_result}")
-                                    return tool_result
-                                except AttributeError:
-                                    logging.error(f"HarikuService does not have method: {fc.name}")
-                                    return f"[Gemini Error] Requested tool '{fc.name}' not found."
-                                except Exception as tool_e:
-                                    logging.error(f"Error executing Hariku tool {fc.name}: {tool_e}", exc_info=True)
-                                    return f"[Gemini Error] Failed to execute tool '{fc.name}': {tool_e}"
-                            else:
-                                return "[Gemini Error] Hariku service not available to execute tool."
-                        elif hasattr(part, 'text'):
-                            full_text_from_parts += part.text
-
-                    if full_text_from_parts.strip():
-                        return full_text_from_parts
-                
-                # Fallback to response.text if no parts or no relevant content in parts
-                if hasattr(response, 'text') and response.text.strip():
-                    return response.text.strip()
-
-                elif hasattr(response, 'prompt_feedback') and response.prompt_feedback.block_reason:
-                     return f"[Gemini Error] Request blocked: {response.prompt_feedback.block_reason.name}"
-
-                return "[Gemini] (Received an empty response or unhandled content)"
+                return self._process_response(response)
+
+        cache_key = self._cache_key(instructions, prompt) if use_cache else None
+        return self._guarded(lambda: self._cached_call(cache_key, call))
+
+    def _guarded(self, run):
+        try:
+            return run()
         except StopCandidateException as e:
             logging.error(f"Gemini StopCandidateException: {e}")
             if e.candidate and e.candidate.function_calls:
@@ -254,8 +339,70 @@ class GeminiService:
             logging.error(f"Error during Gemini API call: {e}", exc_info=True)
             return "[Bot Error] Error contacting Gemini."
 
+    def _process_response(self, response):
+        """Returns (text, cacheable) for a Gemini response, running any requested Hariku tool."""
+        if response.candidates and response.candidates[0].content.parts:
+            logging.debug(f"Gemini response parts: {response.candidates[0].content.parts}")
+            full_text_from_parts = ""
+
+            for part in response.candidates[0].content.parts:
+                if hasattr(part, 'function_call'):
+                    fc = part.function_call
+                    if not fc.name:
+                        logging.warning("Gemini requested an empty function call name. Skipping tool execution.")
+                        continue
+
+                    logging.info(f"Gemini requested function call: {fc.name} with args {fc.args}")
+                    if self.hariku_service:
+                        try:
+                            func = getattr(self.hariku_service, fc.name)
+                            args_dict = {key: getattr(fc.args, key) for key in fc.args.keys()}
+                            tool_result = func(**args_dict)
+                            logging.info(f"Hariku tool result: {tool_result}")
+                            return tool_result, False
+                        except AttributeError:
+                            logging.error(f"HarikuService does not have method: {fc.name}")
+                            return f"[Gemini Error] Requested tool '{fc.name}' not found.", False
+                        except Exception as tool_e:
+                            logging.error(f"Error executing Hariku tool {fc.name}: {tool_e}", exc_info=True)
+                            return f"[Gemini Error] Failed to execute tool '{fc.name}': {tool_e}", False
+                    else:
+                        return "[Gemini Error] Hariku service not available to execute tool.", False
+                elif hasattr(part, 'text'):
+                    full_text_from_parts += part.text
+
+            if full_text_from_parts.strip():
+                return full_text_from_parts, True
+
+        # Fallback to response.text if no parts or no relevant content in parts
+        if hasattr(response, 'text') and response.text.strip():
+            return response.text.strip(), True
+
+        elif hasattr(response, 'prompt_feedback') and response.prompt_feedback.block_reason:
+             return f"[Gemini Error] Request blocked: {response.prompt_feedback.block_reason.name}", False
+
+        return "[Gemini] (Received an empty response or unhandled content)", False
+
     def generate_welcome_message(self, nickname: str) -> str:
         if not self.is_enabled():
             return ""
         prompt = f"Generate a short, friendly welcome message for a new user named {nickname} joining a chat. Keep it concise and welcoming."
-        return self.generate_simple_content(prompt, model_to_use=self.welcome_model)
+        # Welcomes should vary between joins, so they skip the response cache
+        return self.generate_simple_content(prompt, model_to_use=self.welcome_model, use_cache=False)
+
+    def generate_welcome_templates(self, count: int, placeholder: str = "{nickname}") -> list[str]:
+        """Generates up to count welcome templates in a single call, each containing placeholder."""
+        if not self.is_enabled():
+            return []
+        prompt = (f"Generate {count} different short, friendly welcome messages for a new user joining a chat. "
+                  f"Write {placeholder} exactly where the user's name goes. Put each message on its own line, without numbering.")
+        text = self.generate_simple_content(prompt, model_to_use=self.welcome_model, use_cache=False)
+        if text.startswith(("[Gemini", "[Bot Error]")):
+            logging.warning(f"Welcome template generation failed: {text}")
+            return []
+        templates = []
+        for line in text.splitlines():
+            line = re.sub(r'^\s*(?:[-*\u2022]|\d+[.)])\s*', '', line).strip()
+            if placeholder in line:
+                templates.append(line)
+        return templates[:count]
@@ -1,36 +1,85 @@
+import datetime
 import logging
 try:
     import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
     REQUESTS_AVAILABLE = True
 except ImportError:
     REQUESTS_AVAILABLE = False
+from services.response_cache import TTLCache
 
 hariku_logger = logging.getLogger(__name__)
 hariku_logger.setLevel(logging.INFO)
 
+FOREVER = float('inf')
+CONNECT_TIMEOUT = 3 # seconds; reads keep their per-call timeout
+
+def _seconds_until(next_boundary: datetime.datetime) -> float:
+    return max(1.0, (next_boundary - datetime.datetime.now()).total_seconds())
+
+def _ttl_until_tomorrow() -> float:
+    today = datetime.date.today()
+    return _seconds_until(datetime.datetime.combine(today + datetime.timedelta(days=1), datetime.time()))
+
+def _ttl_until_next_month() -> float:
+    today = datetime.date.today()
+    first_next = datetime.date(today.year + (today.month == 12), today.month % 12 + 1, 1)
+    return _seconds_until(datetime.datetime.combine(first_next, datetime.time()))
+
+def _ttl_until_next_year() -> float:
+    return _seconds_until(datetime.datetime(datetime.date.today().year + 1, 1, 1))
+
 class HarikuService:
-    def __init__(self, api_key):
+    def __init__(self, api_key, cache_max_entries: int = 512):
         self.api_key = api_key
         self._enabled = REQUESTS_AVAILABLE and bool(self.api_key)
         hariku_logger.info(f"HarikuService initialized. Requests available: {REQUESTS_AVAILABLE}, API Key present: {bool(self.api_key)}, Enabled: {self._enabled}")
         self.base_url_quotes = "https://www.techlabs.lol/hariku/quotes/"
         self.base_url_calendar = "https://www.techlabs.lol/hariku/calendar/"
-        self.headers = {
-            "Authorization": f"Bearer {self.api_key}"
-        }
+        # Calendar data is static for at least a day, so entries live until their period rolls over
+        self.cache = TTLCache(max_entries=cache_max_entries, default_ttl=3600, name="hariku_cache")
+        self.session = self._create_session() if REQUESTS_AVAILABLE else None
+
+    @staticmethod
+    def _create_session():
+        # Shared keep-alive session. Only quick 429/5xx answers are retried: a dead or slow endpoint
+        # fails after one connect/read timeout instead of several
+        retry = Retry(total=2, connect=0, read=0, status=2, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504), allowed_methods=frozenset(["GET"]))
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=1, pool_maxsize=8)
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    @property
+    def headers(self):
+        # Built from the current key so a key set via 'harikuapi' takes effect immediately
+        return {"Authorization": f"Bearer {self.api_key}"}
 
     def is_enabled(self):
         return self._enabled
 
+    def get_cache_stats(self):
+        return self.cache.stats()
+
+    def _get_json(self, url, params=None, ttl=None):
+        def fetch():
+            response = self.session.get(url, headers=self.headers, params=params, timeout=(CONNECT_TIMEOUT, 10))
+            response.raise_for_status()
+            return response.json()
+        if ttl is None:
+            return fetch()
+        cache_key = (url, tuple(sorted(params.items())) if params else ())
+        return self.cache.get_or_load(cache_key, fetch, ttl=ttl)
+
     def get_random_quote(self, lang="en"):
         if not self.is_enabled():
             return "[Bot] Hariku service is disabled (check API key/library)."
         
         url = f"{self.base_url_quotes}{lang}/random"
         try:
-            response = requests.get(url, headers=self.headers, timeout=10)
-            response.raise_for_status()
-            data = response.json()
+            data = self._get_json(url)
             hariku_logger.info(f"Hariku API raw response: {data}")
             if data and data.get('quote_text'):
                 return f"\"{data['quote_text']}\" - {data.get('author', 'Unknown')}"
@@ -48,9 +97,7 @@ class HarikuService:
             
         url = f"{self.base_url_calendar}{country_code}/today"
         try:
-            response = requests.get(url, headers=self.headers, timeout=10)
-            response.raise_for_status()
-            data = response.json()
+            data = self._get_json(url, ttl=_ttl_until_tomorrow())
             
             if not data or not isinstance(data, list):
                 return f"No events found for today in {country_code}."
@@ -73,9 +120,7 @@ class HarikuService:
         
         url = f"{self.base_url_quotes}{lang}/id/{quote_id}"
         try:
-            response = requests.get(url, headers=self.headers, timeout=10)
-            response.raise_for_status()
-            data = response.json()
+            data = self._get_json(url, ttl=FOREVER)
             hariku_logger.info(f"Hariku API raw response for ID {quote_id}: {data}")
             if data and data.get("quote_text"):
                 return f"\"{data['quote_text']}\" - {data.get('author', 'Unknown')}"
@@ -93,9 +138,7 @@ class HarikuService:
         
         url = f"{self.base_url_calendar}{country_code}/date/{date_str}"
         try:
-            response = requests.get(url, headers=self.headers, timeout=10)
-            response.raise_for_status()
-            data = response.json()
+            data = self._get_json(url, ttl=_ttl_until_tomorrow())
             
             if not data or not isinstance(data, list):
                 return f"No events found for {date_str} in {country_code}."
@@ -118,9 +161,7 @@ class HarikuService:
         
         url = f"{self.base_url_calendar}{country_code}/week/{date_str}"
         try:
-            response = requests.get(url, headers=self.headers, timeout=10)
-            response.raise_for_status()
-            data = response.json()
+            data = self._get_json(url, ttl=_ttl_until_tomorrow())
             
             if not data or not isinstance(data, list):
                 return f"No events found for the week starting {date_str} in {country_code}."
@@ -143,9 +184,7 @@ class HarikuService:
         
         url = f"{self.base_url_calendar}{country_code}/month/{month_str}"
         try:
-            response = requests.get(url, headers=self.headers, timeout=10)
-            response.raise_for_status()
-            data = response.json()
+            data = self._get_json(url, ttl=_ttl_until_next_month())
             
             if not data or not isinstance(data, list):
                 return f"No events found for {month_str} in {country_code}."
@@ -168,9 +207,7 @@ class HarikuService:
         
         url = f"{self.base_url_calendar}{country_code}/year/{year_str}"
         try:
-            response = requests.get(url, headers=self.headers, timeout=10)
-            response.raise_for_status()
-            data = response.json()
+            data = self._get_json(url, ttl=_ttl_until_next_year())
             
             if not data or not isinstance(data, list):
                 return f"No events found for {year_str} in {country_code}."
@@ -191,11 +228,9 @@ class HarikuService:
         if not self.is_enabled():
             return "[Bot] Hariku service is disabled (check API key/library)."
         
-        url = f"{self.base_url_calendar}{country_code}/search?q={query}"
+        url = f"{self.base_url_calendar}{country_code}/search"
         try:
-            response = requests.get(url, headers=self.headers, timeout=10)
-            response.raise_for_status()
-            data = response.json()
+            data = self._get_json(url, params={"q": query}, ttl=_ttl_until_tomorrow())
             
             if not data or not isinstance(data, list):
                 return f"No events found for '{query}' in {country_code}."
@@ -220,7 +255,7 @@ class HarikuService:
         temp_headers = {"Authorization": f"Bearer {api_key}"}
         test_url = f"{self.base_url_quotes}en/random"
         try:
-            response = requests.get(test_url, headers=temp_headers, timeout=5)
+            response = self.session.get(test_url, headers=temp_headers, timeout=(CONNECT_TIMEOUT, 5))
             response.raise_for_status()
             return True
         except requests.exceptions.RequestException as e:
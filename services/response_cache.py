@@ -0,0 +1,131 @@
+import collections
+import logging
+import threading
+import time
+
+_MISSING = object()
+
+class _InFlight:
+    __slots__ = ('event', 'value', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+class TTLCache:
+    """Thread-safe LRU cache with per-entry expiry and request coalescing.
+
+    Concurrent get_or_load() calls for the same key share a single loader call.
+    With max_bytes set, sizeof(value) is summed and LRU entries are evicted to stay under it.
+    """
+
+    def __init__(self, max_entries: int = 256, default_ttl: float = 300.0, name: str = "cache", max_bytes: int = 0, sizeof=None):
+        self.max_entries = max(1, int(max_entries))
+        self.default_ttl = float(default_ttl)
+        self.name = name
+        self.max_bytes = max(0, int(max_bytes)) # 0 = no byte bound
+        self._sizeof = sizeof if sizeof is not None else (lambda value: 0)
+        self._entries = collections.OrderedDict() # key -> (expires_at, value, size)
+        self._bytes = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.coalesced = self.evictions = 0
+
+    def __len__(self): return len(self._entries)
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._get_locked(key)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return value
+
+    def _get_locked(self, key):
+        entry = self._entries.get(key)
+        if entry is None: return _MISSING
+        expires_at, value, size = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self._bytes -= size
+            return _MISSING
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key, value, ttl: float = None):
+        # ttl=None uses default_ttl; float('inf') keeps the entry until it is evicted by LRU
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl <= 0: return
+        size = self._sizeof(value) if self.max_bytes else 0
+        if self.max_bytes and size > self.max_bytes: return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None: self._bytes -= old[2]
+            self._entries[key] = (time.monotonic() + ttl, value, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or (self.max_bytes and self._bytes > self.max_bytes):
+                self._bytes -= self._entries.popitem(last=False)[1][2]
+                self.evictions += 1
+
+    def get_or_load(self, key, loader, ttl: float = None, should_cache=None):
+        """Returns the cached value for key, calling loader() at most once across concurrent callers."""
+        with self._lock:
+            value = self._get_locked(key)
+            if value is not _MISSING:
+                self.hits += 1
+                return value
+            pending = self._inflight.get(key)
+            if pending is None:
+                pending = self._inflight[key] = _InFlight()
+                is_owner = True
+                self.misses += 1
+            else:
+                is_owner = False
+                self.coalesced += 1
+
+        if not is_owner:
+            pending.event.wait()
+            if pending.error is not None: raise pending.error
+            return pending.value
+
+        try:
+            value = loader()
+            pending.value = value
+            if should_cache is None or should_cache(value):
+                self.set(key, value, ttl)
+            return value
+        except Exception as e:
+            pending.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            pending.event.set()
+
+    def invalidate(self, key):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None: self._bytes -= old[2]
+
+    def clear(self):
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+            self._bytes = 0
+        logging.debug(f"{self.name}: cleared {count} entries.")
+        return count
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
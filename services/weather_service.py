@@ -2,27 +2,46 @@
 import logging
 try:
     import requests
+    from requests.adapters import HTTPAdapter
     REQUESTS_AVAILABLE = True
 except ImportError:
     REQUESTS_AVAILABLE = False
+from services.response_cache import TTLCache
 
 class WeatherService:
-    def __init__(self, api_key):
+    def __init__(self, api_key, cache_ttl: int = 600, cache_max_entries: int = 256):
         self.api_key = api_key
         self._enabled = REQUESTS_AVAILABLE and bool(self.api_key)
-        self.base_url = "[http://api.openweathermap.org/data/2.5/weather](http://api.openweathermap.org/data/2.5/weather)?"
+        self.base_url = "http://api.openweathermap.org/data/2.5/weather"
+        self.cache = TTLCache(max_entries=cache_max_entries, default_ttl=cache_ttl, name="weather_cache")
+        self.session = None
+        if REQUESTS_AVAILABLE:
+            # One pooled keep-alive session instead of a new TLS handshake per lookup
+            self.session = requests.Session()
+            self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=8))
+            self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=8))
 
     def is_enabled(self):
         return self._enabled
 
+    def get_cache_stats(self):
+        return self.cache.stats()
+
     def get_weather(self, location):
         if not self.is_enabled():
             return "[Bot] Weather feature is disabled (check API key/library)."
 
-        complete_url = self.base_url + "appid=" + self.api_key + "&q=" + location + "&units=metric"
-        
+        cache_key = " ".join(location.lower().split())
+        return self.cache.get_or_load(
+            cache_key,
+            lambda: self._fetch_weather(location),
+            should_cache=lambda reply: not reply.startswith("[Weather Error]")
+        )
+
+    def _fetch_weather(self, location):
+        params = {"appid": self.api_key, "q": location, "units": "metric"}
         try:
-            response = requests.get(complete_url, timeout=10)
+            response = self.session.get(self.base_url, params=params, timeout=10)
             response.raise_for_status()
             data = response.json()
 
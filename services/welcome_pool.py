@@ -0,0 +1,68 @@
+import collections
+import logging
+import threading
+import time
+
+NICKNAME_PLACEHOLDER = "{nickname}"
+
+class WelcomePool:
+    """Keeps a stock of pre-generated welcome templates so joins never wait on the AI.
+
+    Templates contain NICKNAME_PLACEHOLDER and are refilled in the background, one AI call
+    per batch, whenever the stock drops below the low watermark.
+    """
+
+    def __init__(self, generator, submit, size: int = 8, low_watermark: int = 3, retry_delay: float = 60.0):
+        self.generator = generator # generator(count) -> list of templates; runs on a worker thread
+        self.submit = submit # submit(job, on_done, on_error) -> bool
+        self.retry_delay = retry_delay
+        self.configure(size, low_watermark)
+        self._templates = collections.deque()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._refilling = False
+        self._retry_after = 0.0
+
+    def __len__(self): return len(self._templates)
+
+    def configure(self, size: int, low_watermark: int):
+        self.size = max(1, int(size))
+        self.low_watermark = min(self.size, max(1, int(low_watermark)))
+
+    def take(self, nickname: str):
+        """Returns a welcome for nickname, or None if the pool is empty."""
+        with self._lock:
+            template = self._templates.popleft() if self._templates else None
+        self.ensure_filled()
+        # str.replace, not format(): generated text may contain other braces
+        return template.replace(NICKNAME_PLACEHOLDER, nickname) if template else None
+
+    def invalidate(self):
+        # Templates (and in-flight batches) from the old instructions are dropped
+        with self._lock:
+            self._generation += 1
+            self._templates.clear()
+            self._refilling = False
+            self._retry_after = 0.0
+        logging.debug("Welcome pool invalidated.")
+
+    def ensure_filled(self):
+        with self._lock:
+            if self._refilling or len(self._templates) >= self.low_watermark or time.monotonic() < self._retry_after:
+                return
+            self._refilling = True
+            generation, count = self._generation, self.size - len(self._templates)
+
+        def on_done(templates):
+            with self._lock:
+                if generation != self._generation: return
+                self._refilling = False
+                if not templates:
+                    self._retry_after = time.monotonic() + self.retry_delay
+                    return
+                self._templates.extend(templates[:self.size - len(self._templates)])
+            logging.debug(f"Welcome pool refilled with {len(templates)} templates.")
+
+        if not self.submit(lambda: self.generator(count), on_done, lambda e: on_done([])):
+            with self._lock:
+                if generation == self._generation: self._refilling = False
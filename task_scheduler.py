@@ -0,0 +1,69 @@
+import heapq
+import itertools
+import logging
+import queue
+import threading
+import time
+
+class ScheduledTask:
+    __slots__ = ('when', 'callback', 'args', 'cancelled')
+
+    def __init__(self, when, callback, args):
+        self.when = when
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+class TaskScheduler:
+    """Queues callbacks from any thread and runs them on the bot's event-loop thread."""
+
+    def __init__(self):
+        self._ready = queue.SimpleQueue()
+        self._timers = []
+        self._timers_lock = threading.Lock()
+        self._counter = itertools.count()
+
+    def call_soon(self, callback, *args):
+        # Safe to call from worker threads; the callback runs on the next run_pending()
+        self._ready.put((callback, args))
+
+    def call_later(self, delay: float, callback, *args) -> ScheduledTask:
+        task = ScheduledTask(time.monotonic() + max(0.0, delay), callback, args)
+        with self._timers_lock:
+            heapq.heappush(self._timers, (task.when, next(self._counter), task))
+        return task
+
+    def _release_due_timers(self):
+        now = time.monotonic()
+        with self._timers_lock:
+            while self._timers and self._timers[0][0] <= now:
+                task = heapq.heappop(self._timers)[2]
+                if not task.cancelled:
+                    self._ready.put((task.callback, task.args))
+
+    def run_pending(self, max_tasks: int = 100) -> int:
+        if self._timers: self._release_due_timers()
+        ran = 0
+        while ran < max_tasks:
+            try:
+                callback, args = self._ready.get_nowait()
+            except queue.Empty:
+                break
+            ran += 1
+            try:
+                callback(*args)
+            except Exception as e:
+                logging.error(f"Error running scheduled task {getattr(callback, '__name__', callback)}: {e}", exc_info=True)
+        return ran
+
+    def clear(self):
+        with self._timers_lock:
+            self._timers.clear()
+        while True:
+            try:
+                self._ready.get_nowait()
+            except queue.Empty:
+                return
@@ -0,0 +1,133 @@
+import collections
+import logging
+import sys
+
+_INTERN_MAX = 4096
+_interned = {} # raw TTCHAR value -> decoded str, shared by every snapshot
+
+def tt_decode(value) -> str:
+    """Decodes a TTCHAR field (bytes, or str on Windows) once and returns a shared str.
+
+    Nicknames and usernames repeat across events, so the same raw value always maps to the same object.
+    """
+    if not value: return ''
+    text = _interned.get(value)
+    if text is None:
+        if len(_interned) >= _INTERN_MAX: _interned.clear()
+        text = value.decode('utf-8', errors='replace') if isinstance(value, bytes) else value
+        _interned[value] = text = sys.intern(text)
+    return text
+
+def _lookup_key(value) -> str:
+    # Accepts both decoded str and raw TTCHAR bytes, whatever the platform
+    if isinstance(value, bytes): value = value.decode('utf-8', errors='replace')
+    return (value or '').lower()
+
+class UserSnapshot:
+    """Decoded, immutable-by-convention copy of a TeamTalk User struct, taken once per event."""
+    __slots__ = ('user_id', 'nickname', 'username', 'status_msg', 'channel_id', 'user_type')
+
+    def __init__(self, user_id: int, nickname: str, username: str, status_msg: str, channel_id: int, user_type: int):
+        self.user_id = user_id
+        self.nickname = nickname
+        self.username = username
+        self.status_msg = status_msg
+        self.channel_id = channel_id
+        self.user_type = user_type
+
+    @classmethod
+    def from_user(cls, user):
+        # Each ctypes field access is an FFI read, so every field is read exactly once here
+        return cls(user.nUserID, tt_decode(user.szNickname), tt_decode(user.szUsername),
+                   tt_decode(user.szStatusMsg), user.nChannelID, user.uUserType)
+
+    def __repr__(self): return f"UserSnapshot({self.user_id}, {self.nickname!r}, {self.username!r})"
+
+class UserRoster:
+    """In-memory copy of the server's users, keyed by user ID with nickname/username indexes.
+
+    Kept up to date from TeamTalk user events so lookups never need a full getServerUsers() scan.
+    Users are stored as UserSnapshot objects, so readers never touch ctypes or decode strings.
+    """
+
+    def __init__(self, admin_usernames=()):
+        self._users = {}
+        self._keys = {} # user_id -> (nickname_lower, username_lower)
+        self._by_nick = collections.defaultdict(set)
+        self._by_username = collections.defaultdict(set)
+        self.admin_usernames = {_lookup_key(n) for n in admin_usernames}
+        self.admin_user_ids = set()
+
+    def __len__(self): return len(self._users)
+    def __contains__(self, user_id): return user_id in self._users
+
+    def reset(self, users):
+        self.clear()
+        for user in users or []:
+            self.upsert(user)
+        logging.debug(f"UserRoster reset with {len(self._users)} users.")
+
+    def clear(self):
+        self._users.clear(); self._keys.clear()
+        self._by_nick.clear(); self._by_username.clear()
+        self.admin_user_ids.clear()
+
+    def upsert(self, user):
+        """Stores a snapshot of a ctypes User (or an existing UserSnapshot) and returns it."""
+        if not user: return None
+        # Event payloads point into a reused message buffer, so the snapshot is our own copy
+        stored = user if isinstance(user, UserSnapshot) else UserSnapshot.from_user(user)
+        user_id = stored.user_id
+        if user_id <= 0: return None
+        nick_key, username_key = stored.nickname.lower(), stored.username.lower()
+
+        old_keys = self._keys.get(user_id)
+        if old_keys != (nick_key, username_key):
+            if old_keys: self._unindex(user_id, old_keys)
+            self._by_nick[nick_key].add(user_id)
+            self._by_username[username_key].add(user_id)
+            self._keys[user_id] = (nick_key, username_key)
+            if username_key in self.admin_usernames: self.admin_user_ids.add(user_id)
+            else: self.admin_user_ids.discard(user_id)
+        self._users[user_id] = stored
+        return stored
+
+    def remove(self, user_id):
+        self._users.pop(user_id, None)
+        keys = self._keys.pop(user_id, None)
+        if keys: self._unindex(user_id, keys)
+        self.admin_user_ids.discard(user_id)
+
+    def _unindex(self, user_id, keys):
+        nick_key, username_key = keys
+        for index, key in ((self._by_nick, nick_key), (self._by_username, username_key)):
+            ids = index.get(key)
+            if ids is not None:
+                ids.discard(user_id)
+                if not ids: del index[key]
+
+    def get(self, user_id):
+        return self._users.get(user_id)
+
+    def users(self):
+        return self._users.values()
+
+    def in_channel(self, channel_id):
+        return [user for user in self._users.values() if user.channel_id == channel_id]
+
+    def find_by_nick(self, nick, channel_id=None):
+        for user_id in self._by_nick.get(_lookup_key(nick), ()):
+            user = self._users[user_id]
+            if channel_id is None or user.channel_id == channel_id:
+                return user
+        return None
+
+    def find_by_username(self, username):
+        return [self._users[uid] for uid in self._by_username.get(_lookup_key(username), ())]
+
+    def is_username_online(self, username):
+        return bool(self._by_username.get(_lookup_key(username)))
+
+    def set_admin_usernames(self, admin_usernames):
+        self.admin_usernames = {_lookup_key(n) for n in admin_usernames}
+        self.admin_user_ids = {uid for uid, (_, username_key) in self._keys.items() if username_key in self.admin_usernames}
@@ -4,6 +4,7 @@ from .bot_routes import bot_bp
 from .config_routes import config_bp
 from .user_routes import user_bp
 from .log_routes import log_bp
+from .event_routes import event_bp
 from .main_routes import main_bp
 
 app = create_app()
@@ -17,6 +18,7 @@ app.register_blueprint(bot_bp)
 app.register_blueprint(config_bp)
 app.register_blueprint(user_bp)
 app.register_blueprint(log_bp)
+app.register_blueprint(event_bp)
 app.register_blueprint(main_bp)
 
 if __name__ == '__main__':
@@ -5,86 +5,15 @@ from .core import get_bot_controller
 
 bot_bp = Blueprint('bot', __name__)
 
-def _sanitize_for_json(value):
-    if hasattr(value, 'value'): # Handle ctypes objects (like c_uint, c_int)
-        return value.value
-    if isinstance(value, bytes):
-        return value.decode('utf-8', errors='ignore')
-    return value
-
 @bot_bp.route('/status', methods=['GET'])
 @login_required
 def get_status():
     bot_controller = get_bot_controller()
-    status = {"running": False} # Default status
-
     try:
-        if bot_controller:
-            bot_logger.debug("get_status: bot_controller exists.")
-            if bot_controller.bot_instance:
-                bot_logger.debug("get_status: bot_controller.bot_instance exists.")
-                status["running"] = bot_controller.bot_thread.is_alive() if bot_controller.bot_thread else False
-                bot_logger.debug(f"get_status: running={status['running']}")
-                
-                status["logged_in"] = bot_controller.bot_instance._logged_in
-                bot_logger.debug(f"get_status: logged_in={status['logged_in']}")
-                
-                status["in_channel"] = bot_controller.bot_instance._in_channel
-                bot_logger.debug(f"get_status: in_channel={status['in_channel']}")
-
-                status["features"] = {
-                    "announce_join_leave": bot_controller.bot_instance.announce_join_leave,
-                    "allow_channel_messages": bot_controller.bot_instance.allow_channel_messages,
-                    "allow_broadcast": bot_controller.bot_instance.allow_broadcast,
-                    "allow_gemini_pm": bot_controller.bot_instance.allow_gemini_pm,
-                    "allow_gemini_channel": bot_controller.bot_instance.allow_gemini_channel,
-                    "filter_enabled": bot_controller.bot_instance.filter_enabled,
-                    "bot_locked": bot_controller.bot_instance.bot_locked,
-                    "context_history_enabled": bot_controller.bot_instance.context_history_enabled,
-                    "debug_logging_enabled": bot_controller.bot_instance.debug_logging_enabled,
-                }
-                bot_logger.debug(f"get_status: features={status['features']}")
-                
-                # Ensure config is JSON serializable
-                if bot_controller.config:
-                    try:
-                        import json
-                        # Basic check, but ideally we should sanitize config too if it has bytes
-                        json.dumps(bot_controller.config) 
-                        status["config"] = bot_controller.config
-                        bot_logger.debug("get_status: config is JSON serializable.")
-                    except TypeError as e:
-                        bot_logger.error(f"get_status: Config is not JSON serializable: {e}", exc_info=True)
-                        status["config"] = {"error": "Config not serializable"}
-                else:
-                    status["config"] = {}
-                    bot_logger.debug("get_status: bot_controller.config is None.")
-
-                # Add TeamTalk server connection details
-                if status["running"] and bot_controller.bot_instance._logged_in:
-                    status["server_info"] = {
-                        "host": _sanitize_for_json(bot_controller.bot_instance.host),
-                        "tcp_port": bot_controller.bot_instance.tcp_port,
-                        "udp_port": bot_controller.bot_instance.udp_port,
-                        "nickname": _sanitize_for_json(bot_controller.bot_instance.nickname),
-                        "username": _sanitize_for_json(bot_controller.bot_instance.username),
-                        "target_channel_path": _sanitize_for_json(bot_controller.bot_instance.target_channel_path),
-                        "my_user_id": bot_controller.bot_instance._my_user_id,
-                        "my_rights": _sanitize_for_json(bot_controller.bot_instance.my_rights),
-                        "client_name": _sanitize_for_json(bot_controller.bot_instance.client_name),
-                        "status_message": _sanitize_for_json(bot_controller.bot_instance.status_message),
-                        "logged_in": bot_controller.bot_instance._logged_in,
-                        "in_channel": bot_controller.bot_instance._in_channel,
-                    }
-                    bot_logger.debug(f"get_status: server_info={status['server_info']}")
-            else:
-                bot_logger.debug("get_status: bot_controller.bot_instance is None.")
-        else:
-            bot_logger.debug("get_status: bot_controller is None.")
+        status = bot_controller.get_status() if bot_controller else {"running": False}
     except Exception as e:
         bot_logger.error(f"Error in get_status: {e}", exc_info=True)
         status = {"running": False, "error": str(e)}
-    
     return jsonify(status)
 
 @bot_bp.route('/start', methods=['POST'])
@@ -1,6 +1,6 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from .auth import login_required, super_admin_required
-from config_manager import load_config, save_config, DEFAULT_CONFIG
+from config_manager import load_config, save_config, update_config, DEFAULT_CONFIG
 from logger_config import bot_logger
 from .core import get_bot_controller
 
@@ -20,7 +20,7 @@ def setup_config():
 
         bot_logger.debug(f"DEBUG: new_config_data from form: {new_config_data}")
 
-        current_config = DEFAULT_CONFIG
+        current_config = {section: dict(values) for section, values in DEFAULT_CONFIG.items()}
         
         for section, settings in new_config_data.items():
             if section in current_config:
@@ -39,7 +39,7 @@ def setup_config():
 
         bot_logger.debug(f"DEBUG: current_config before save in setup_config: {current_config}")
         save_config(current_config)
-        bot_controller.config = current_config
+        bot_controller.config = load_config() or current_config
         flash('Configuration saved successfully.', 'success')
         return redirect(url_for('main.index'))
 
@@ -67,7 +67,8 @@ def manage_config():
 
         bot_logger.debug(f"DEBUG: new_config_data from JSON in manage_config: {new_config_data}")
 
-        current_config = bot_controller.config if bot_controller.config else load_config() or DEFAULT_CONFIG
+        # A copy: the controller's config is the running bot's own dict, which only the event loop may change
+        current_config = {section: dict(values) for section, values in (bot_controller.config or load_config() or DEFAULT_CONFIG).items()}
         bot_logger.debug(f"DEBUG: current_config before merge in manage_config: {current_config}")
         
         for section, settings in new_config_data.items():
@@ -79,12 +80,13 @@ def manage_config():
 
         bot_logger.debug(f"DEBUG: current_config after merge in manage_config: {current_config}")
 
-        save_config(current_config)
-        bot_controller.config = current_config
-        
-        if bot_controller.bot_thread and bot_controller.bot_thread.is_alive():
-            bot_logger.info("Bot is running, initiating restart to apply new configuration.")
-            bot_controller.request_restart()
-            return jsonify({"status": "success", "message": 'Configuration updated and bot restart initiated.'})
+        # Only the posted keys are merged onto config.ini, so changes the bot saved meanwhile are kept
+        update_config({section: settings for section, settings in new_config_data.items() if section != 'WebUI'})
+        restart_keys = bot_controller.apply_config(load_config() or current_config)
+
+        if restart_keys:
+            return jsonify({"status": "success", "message": f"Configuration updated and bot restart initiated ({', '.join(restart_keys)} changed)."})
+        elif restart_keys is not None:
+            return jsonify({"status": "success", "message": 'Configuration updated and applied without restart.'})
         else:
             return jsonify({"status": "success", "message": 'Configuration updated.'})
\ No newline at end of file
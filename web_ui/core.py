@@ -1,21 +1,18 @@
 from flask import Flask
 import os
 from datetime import timedelta
-from dotenv import load_dotenv
 
 from bot_controller import ApplicationController
-from config_manager import load_config, DEFAULT_CONFIG
+from config_manager import config_service, load_config, DEFAULT_CONFIG
 from logger_config import setup_logging, bot_logger
 from .database import db
 
-load_dotenv()
-
 _bot_controller_instance = None
 
 def create_app():
     app = Flask(__name__, template_folder='templates', static_folder='static')
 
-    initial_config = load_config()
+    initial_config = config_service.get() # Also loads .env and SECRET_KEY
     bot_logger.debug(f"Initial config loaded: {initial_config is not None}")
 
     app.secret_key = os.getenv('SECRET_KEY', 'a_fallback_secret_key_if_env_not_set')
@@ -43,7 +40,7 @@ def init_bot_controller(app):
     global _bot_controller_instance
     if _bot_controller_instance is None:
         _bot_controller_instance = ApplicationController(nogui_mode=True)
-        initial_config = load_config() # Reload config to ensure it's fresh
+        initial_config = load_config() # Typed copy of the cached snapshot
         _bot_controller_instance.config = initial_config
         bot_logger.debug(f"Bot controller config set: {_bot_controller_instance.config is not None}")
     return _bot_controller_instance
@@ -0,0 +1,36 @@
+import json
+import time
+from flask import Blueprint, Response, stream_with_context
+from .auth import login_required
+from .core import get_bot_controller
+from event_bus import event_bus
+
+event_bp = Blueprint('event', __name__)
+
+KEEPALIVE_SECONDS = 15
+STREAM_MAX_SECONDS = 300 # Browsers reconnect on their own, which re-checks the login session
+
+def _format_event(topic, data):
+    payload = data if isinstance(data, str) else json.dumps(data)
+    # Multi-line payloads (tracebacks) become one data: line each; the browser joins them with \n
+    return f"event: {topic}\n" + "".join(f"data: {line}\n" for line in payload.split("\n")) + "\n"
+
+@event_bp.route('/events', methods=['GET'])
+@login_required
+def stream_events():
+    bot_controller = get_bot_controller()
+    if bot_controller: bot_controller.publish_status() # Make sure the retained status is current
+
+    def generate():
+        subscription = event_bus.subscribe() # Starts with the retained status
+        deadline = time.monotonic() + STREAM_MAX_SECONDS
+        try:
+            yield "retry: 3000\n\n"
+            while time.monotonic() < deadline:
+                event = subscription.get(timeout=KEEPALIVE_SECONDS)
+                yield ": keepalive\n\n" if event is None else _format_event(*event)
+        finally:
+            event_bus.unsubscribe(subscription)
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
@@ -1,21 +1,36 @@
-from flask import Blueprint, request
+from flask import Blueprint, jsonify, request
 import os
 from .auth import login_required
-from logger_config import bot_logger
+from logger_config import bot_logger, log_buffer
+import log_tail
 
 log_bp = Blueprint('log', __name__)
 
 @log_bp.route('/logs', methods=['GET'])
 @login_required
 def get_logs():
+    if request.args.get('format') == 'json':
+        # Structured query over the in-memory buffer: ?level=WARNING&q=text&cursor=<seq>&limit=N
+        entries, cursor, reset = log_buffer.query(
+            level=request.args.get('level'),
+            text=request.args.get('q'),
+            cursor=request.args.get('cursor', type=int, default=0),
+            limit=max(1, min(request.args.get('limit', type=int, default=500), 5000)))
+        return jsonify({"entries": entries, "cursor": cursor, "reset": reset, "capacity": log_buffer.capacity})
+
     log_file_path = os.path.join(os.getcwd(), 'bot.log')
     if os.path.exists(log_file_path):
-        limit = request.args.get('limit', type=int, default=500)
+        limit = max(1, min(request.args.get('limit', type=int, default=500), 5000))
+        since = request.args.get('since')
+        use_mmap = request.args.get('mmap', default='false').lower() == 'true'
         try:
-            with open(log_file_path, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-                logs = "".join(lines[-limit:])
-            return logs, 200, {'Content-Type': 'text/plain'}
+            # Reads backwards from the end (or forwards from 'since'), never the whole file
+            if since:
+                lines, cursor, reset = log_tail.read_since(log_file_path, since, limit, use_mmap)
+            else:
+                (lines, cursor), reset = log_tail.tail(log_file_path, limit, use_mmap), True
+            logs = "\n".join(lines) + ("\n" if lines else "")
+            return logs, 200, {'Content-Type': 'text/plain', 'X-Log-Offset': cursor, 'X-Log-Reset': '1' if reset else '0'}
         except Exception as e:
             bot_logger.error(f"Error reading log file: {e}", exc_info=True)
             return "Error reading logs.", 500
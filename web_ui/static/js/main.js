@@ -1,19 +1,39 @@
 // web_ui/static/js/main.js
-import { fetchStatus } from './modules/status.js';
-import { fetchLogs } from './modules/logs.js';
+import { fetchStatus, renderStatus } from './modules/status.js';
+import { fetchLogs, appendLiveEntry } from './modules/logs.js';
 import { setupEventListeners } from './modules/eventHandlers.js';
 
 // Initial setup
 setupEventListeners();
 fetchStatus();
 
-// Refresh status every 5 seconds
-setInterval(fetchStatus, 5000);
+let pollingStarted = false;
 
-// Refresh logs every 15 seconds, but only if logs tab is active
-setInterval(() => {
-    const logsTab = document.getElementById('logs-tab');
-    if (logsTab && logsTab.classList.contains('active')) {
-        fetchLogs();
-    }
-}, 15000);
+function startPolling() {
+    if (pollingStarted) return;
+    pollingStarted = true;
+
+    // Refresh status every 5 seconds
+    setInterval(fetchStatus, 5000);
+
+    // Refresh logs every 15 seconds, but only if logs tab is active
+    setInterval(() => {
+        const logsTab = document.getElementById('logs-tab');
+        if (logsTab && logsTab.classList.contains('active')) {
+            fetchLogs();
+        }
+    }, 15000);
+}
+
+// Status changes and new log lines are pushed by the server; polling is only the fallback
+if (window.EventSource) {
+    const events = new EventSource('/events');
+    events.addEventListener('status', (event) => renderStatus(JSON.parse(event.data)));
+    events.addEventListener('log', (event) => appendLiveEntry(JSON.parse(event.data)));
+    events.onerror = () => {
+        // The browser retries by itself; CLOSED means it gave up (e.g. logged out or no stream support)
+        if (events.readyState === EventSource.CLOSED) startPolling();
+    };
+} else {
+    startPolling();
+}
@@ -8,6 +8,8 @@ export const featureListDiv = document.getElementById('featureList');
 export const configAccordion = document.getElementById('configAccordion');
 export const saveConfigButton = document.getElementById('saveConfigButton');
 export const logContainer = document.getElementById('logContainer');
+export const logLevelFilter = document.getElementById('logLevelFilter');
+export const logSearchInput = document.getElementById('logSearch');
 export const userListTableBody = document.getElementById('userListTableBody');
 export const addUserForm = document.getElementById('addUserForm');
 export const newUsernameInput = document.getElementById('newUsername');
@@ -1,10 +1,10 @@
 // web_ui/static/js/modules/eventHandlers.js
-import { startButton, stopButton, restartButton, saveConfigButton, addUserModalElement } from './elements.js';
+import { startButton, stopButton, restartButton, saveConfigButton, addUserModalElement, logLevelFilter, logSearchInput } from './elements.js';
 import { showFlashMessage } from './utils.js';
 import { fetchStatus, updateUIForStoppedBot } from './status.js';
 import { getConfigFromForm, fetchConfig } from './config.js';
 import { fetchUsers, setupAddUserForm } from './users.js';
-import { fetchLogs } from './logs.js';
+import { fetchLogs, resetLogFilters } from './logs.js';
 
 export function setupEventListeners() {
     addUserModalElement.addEventListener('shown.bs.modal', () => {
@@ -71,5 +71,13 @@ export function setupEventListeners() {
         }
     });
 
+    // Filters are applied by the server's /logs query; reload from scratch when they change
+    let searchTimer = null;
+    logLevelFilter.addEventListener('change', resetLogFilters);
+    logSearchInput.addEventListener('input', () => {
+        clearTimeout(searchTimer);
+        searchTimer = setTimeout(resetLogFilters, 300);
+    });
+
     setupAddUserForm();
 }
@@ -1,35 +1,58 @@
 // web_ui/static/js/modules/logs.js
-import { logContainer } from './elements.js';
+import { logContainer, logLevelFilter, logSearchInput } from './elements.js';
 
 let logLines = [];
 const MAX_LOG_LINES = 500; // Batasi jumlah baris log yang ditampilkan
+const LEVELS = { DEBUG: 10, INFO: 20, WARNING: 30, ERROR: 40, CRITICAL: 50 };
+
+let logCursor = 0; // Sequence number of the last entry shown
+let logsLoaded = false; // False until the first fetch; the next fetch then replaces the view
+
+function formatEntry(entry) {
+    return `${entry.time} - ${entry.level} - ${entry.logger} - ${entry.message}`;
+}
+
+function matchesFilters(entry) {
+    const minLevel = LEVELS[logLevelFilter?.value] || 0;
+    const search = (logSearchInput?.value || '').trim().toLowerCase();
+    return (LEVELS[entry.level] || 0) >= minLevel && (!search || entry.message.toLowerCase().includes(search));
+}
 
 export async function fetchLogs() {
-    const response = await fetch('/logs?limit=500'); // Ambil 500 baris terakhir dari server
-    const newLogsText = await response.text();
-    const newLines = newLogsText.split(/\r?\n/).filter(line => line.trim() !== '');
-
-    // Find new lines to append
-    let linesToAppend = [];
-    if (logLines.length === 0) {
-        linesToAppend = newLines;
-    } else {
-        const lastKnownLog = logLines[logLines.length - 1];
-        let found = false;
-        for (let i = 0; i < newLines.length; i++) {
-            if (newLines[i].includes(lastKnownLog)) {
-                found = true;
-                linesToAppend = newLines.slice(i + 1);
-                break;
-            }
-        }
-        if (!found) { // If last known log not found, assume full refresh
-            linesToAppend = newLines;
-            logContainer.innerHTML = ''; // Clear existing logs
-            logLines = [];
-        }
+    // Served from the bot's in-memory log buffer; only entries after the cursor are transferred
+    const params = new URLSearchParams({ format: 'json', limit: MAX_LOG_LINES, cursor: logCursor });
+    if (logLevelFilter?.value) params.set('level', logLevelFilter.value);
+    if (logSearchInput?.value.trim()) params.set('q', logSearchInput.value.trim());
+
+    const response = await fetch(`/logs?${params}`);
+    if (!response.ok) return;
+    const data = await response.json();
+
+    if (!logsLoaded || data.reset) {
+        logContainer.innerHTML = ''; // Clear existing logs
+        logLines = [];
     }
+    logCursor = data.cursor;
+    logsLoaded = true;
+    appendLogLines(data.entries.map(formatEntry));
+}
+
+// Entries pushed over the /events stream
+export function appendLiveEntry(entry) {
+    if (!logsLoaded) return; // The first fetch will include this entry
+    if (entry.seq <= logCursor) return;
+    if (entry.seq !== logCursor + 1) { fetchLogs(); return; } // Missed some; catch up from the cursor
+    logCursor = entry.seq;
+    if (matchesFilters(entry)) appendLogLines([formatEntry(entry)]);
+}
+
+export function resetLogFilters() {
+    logCursor = 0;
+    logsLoaded = false;
+    fetchLogs();
+}
 
+export function appendLogLines(linesToAppend) {
     // Append new lines to the DOM and internal array
     const fragment = document.createDocumentFragment();
     linesToAppend.forEach(line => {
@@ -47,4 +70,4 @@ export async function fetchLogs() {
     }
 
     logContainer.scrollTop = logContainer.scrollHeight; // Scroll ke bawah
-}
\ No newline at end of file
+}
@@ -31,8 +31,15 @@ export async function fetchStatus() {
             throw new TypeError("Oops, we didn't get JSON!");
         }
 
-        const data = await response.json();
-        
+        renderStatus(await response.json());
+    } catch (error) {
+        console.error("Error fetching status:", error);
+        updateUIForStoppedBot();
+    }
+}
+
+// Also called with status pushed over the /events stream
+export function renderStatus(data) {
         if (data.running) {
         botStatusSpan.textContent = 'Running';
         statusIndicator.className = 'status-indicator running';
@@ -126,10 +133,6 @@ export async function fetchStatus() {
     } else {
         updateUIForStoppedBot();
     }
-    } catch (error) {
-        console.error("Error fetching status:", error);
-        updateUIForStoppedBot();
-    }
 }
 
 export function updateUIForStoppedBot() {
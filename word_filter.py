@@ -0,0 +1,77 @@
+import logging
+import re
+
+# Common character substitutions folded away when normalisation is enabled
+LEET_TABLE = str.maketrans({'0': 'o', '1': 'i', '3': 'e', '4': 'a', '5': 's', '7': 't', '@': 'a', '$': 's', '!': 'i'})
+
+def normalize_text(text: str) -> str:
+    return text.lower().translate(LEET_TABLE)
+
+def _runs(word: str):
+    # "pass" -> (('p', 1), ('a', 1), ('s', 2))
+    return tuple((m.group(1), len(m.group(0))) for m in re.finditer(r'(.)\1*', word, re.DOTALL))
+
+def _token_regex(token, stretch: bool) -> str:
+    char, count = token
+    escaped = re.escape(char) * (1 if stretch else count)
+    if not stretch: return escaped
+    # Allow stretched letters: "baaad" still matches "bad", "pass" still needs two s
+    return escaped + ('+' if count == 1 else '{%d,}' % count)
+
+def _trie_pattern(words, stretch: bool = False) -> str:
+    # Factor shared prefixes so the regex engine walks a trie instead of trying every word in turn
+    trie = {}
+    for word in words:
+        node = trie
+        for token in _runs(word):
+            node = node.setdefault(token, {})
+        node[None] = True
+
+    def build(node):
+        branches = [_token_regex(token, stretch) + build(child) for token, child in sorted((k, v) for k, v in node.items() if k is not None)]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if None in node:
+            body = '(?:' + body + ')?'
+        return body
+
+    return build(trie)
+
+class WordFilter:
+    """Matches a whole word list against a message in a single regex pass.
+
+    The pattern is compiled once per word-list change, not per message.
+    """
+
+    def __init__(self, words=(), normalize: bool = False):
+        self.normalize = normalize
+        self._pattern = None
+        self._normalized_pattern = None
+        self.set_words(words)
+
+    def set_words(self, words):
+        words = {w.strip().lower() for w in words if w and w.strip()}
+        self._pattern = self._compile(words)
+        self._normalized_pattern = self._compile({normalize_text(w) for w in words}, stretch=True) if self.normalize else None
+        logging.debug(f"WordFilter compiled for {len(words)} words (normalize={self.normalize}).")
+
+    def set_normalize(self, normalize: bool, words):
+        self.normalize = normalize
+        self.set_words(words)
+
+    @staticmethod
+    def _compile(words, stretch=False):
+        if not words: return None
+        # (?<!\w)/(?!\w) instead of \b so words that start or end with punctuation still match
+        return re.compile(r'(?<!\w)' + _trie_pattern(words, stretch) + r'(?!\w)', re.IGNORECASE)
+
+    def find(self, message: str):
+        """Returns the first filtered word found in message, or None."""
+        if self._pattern is None or not message: return None
+        match = self._pattern.search(message)
+        if match: return match.group(0).lower()
+        if self._normalized_pattern is not None:
+            match = self._normalized_pattern.search(normalize_text(message))
+            if match: return match.group(0)
+        return None